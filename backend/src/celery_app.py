@@ -12,9 +12,9 @@ celery_app = Celery(
 
 # Configure Celery
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer="msgpack",
+    accept_content=["msgpack", "json"],
+    result_serializer="msgpack",
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
@@ -28,7 +28,7 @@ celery_app.conf.update(
 celery_app.conf.beat_schedule = {
     "send-daily-horoscopes": {
         "task": "src.tasks.send_daily_horoscopes",
-        "schedule": crontab(minute=0),  # Every hour
+        "schedule": crontab(minute="*/5"),  # Every 5 minutes, one preferred-time window each
     },
     "reset-usage-counters": {
         "task": "src.tasks.reset_usage_counters",
@@ -1,10 +1,17 @@
 import os
+from functools import lru_cache
 from typing import Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_file="backend/.env",
+        case_sensitive=False,
+        frozen=True
+    )
+    
     # Telegram Bot Configuration
     telegram_bot_token: str = Field(..., env="TELEGRAM_BOT_TOKEN")
     telegram_webhook_url: Optional[str] = Field(None, env="TELEGRAM_WEBHOOK_URL")
@@ -14,6 +21,9 @@ class Settings(BaseSettings):
     # Database Configuration
     database_url: str = Field(..., env="DATABASE_URL")
     redis_url: str = Field("redis://localhost:6379/0", env="REDIS_URL")
+    db_pool_size: int = Field(20, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(40, env="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(5.0, env="DB_POOL_TIMEOUT")
     
     # AI Configuration
     openrouter_api_key: str = Field(..., env="OPENROUTER_API_KEY")
@@ -36,6 +46,7 @@ class Settings(BaseSettings):
     secret_key: str = Field(..., env="SECRET_KEY")
     timezone: str = Field("UTC", env="TIMEZONE")
     log_level: str = Field("INFO", env="LOG_LEVEL")
+    auto_migrate: bool = Field(True, env="AUTO_MIGRATE")
     
     # Celery Configuration
     celery_broker_url: str = Field("redis://localhost:6379/1", env="CELERY_BROKER_URL")
@@ -45,18 +56,22 @@ class Settings(BaseSettings):
     static_files_path: str = Field("/app/static", env="STATIC_FILES_PATH")
     charts_path: str = Field("/app/static/charts", env="CHARTS_PATH")
     tarot_cards_path: str = Field("/app/static/tarot_cards", env="TAROT_CARDS_PATH")
+    geocode_cache_path: str = Field("/app/data/geocode_cache.sqlite3", env="GEOCODE_CACHE_PATH")
+    swe_ephe_path: str = Field("/app/ephe", env="SWE_EPHE_PATH")
     
     # Subscription Pricing (in kopecks for RUB)
     monthly_subscription_price: int = Field(99000, env="MONTHLY_SUBSCRIPTION_PRICE")
     yearly_subscription_price: int = Field(990000, env="YEARLY_SUBSCRIPTION_PRICE")
-    
-    class Config:
-        env_file = "backend/.env"
-        case_sensitive = False
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings from the environment once per process"""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
 
 
 # Language configurations
@@ -68,8 +83,8 @@ SUPPORTED_LANGUAGES = {
 
 DEFAULT_LANGUAGE = "en"
 
-# Tarot deck configuration
-TAROT_CARDS = [
+# Tarot deck configuration (immutable; shared by every reading)
+TAROT_CARDS: tuple[str, ...] = (
     # Major Arcana
     "The Fool", "The Magician", "The High Priestess", "The Empress", "The Emperor",
     "The Hierophant", "The Lovers", "The Chariot", "Strength", "The Hermit",
@@ -95,7 +110,14 @@ TAROT_CARDS = [
     "Ace of Pentacles", "Two of Pentacles", "Three of Pentacles", "Four of Pentacles", "Five of Pentacles",
     "Six of Pentacles", "Seven of Pentacles", "Eight of Pentacles", "Nine of Pentacles", "Ten of Pentacles",
     "Page of Pentacles", "Knight of Pentacles", "Queen of Pentacles", "King of Pentacles"
-]
+)
+
+# Per-suit views of the deck, built once
+MAJOR_ARCANA = TAROT_CARDS[:22]
+WANDS = TAROT_CARDS[22:36]
+CUPS = TAROT_CARDS[36:50]
+SWORDS = TAROT_CARDS[50:64]
+PENTACLES = TAROT_CARDS[64:78]
 
 # Horoscope types
 HOROSCOPE_TYPES = {
@@ -1,17 +1,21 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import DeclarativeBase
+import redis.asyncio as redis
 from src.config import settings
 
-# Sync database setup
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Async database setup
+# Async database setup: one engine per process, backed by an AsyncAdaptedQueuePool
 async_engine = create_async_engine(
     settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=settings.debug
+    echo=settings.debug,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    # Reuse prepared statements for the parameterized queries on the hot path
+    connect_args={"statement_cache_size": 1024, "prepared_statement_cache_size": 256}
 )
 AsyncSessionLocal = async_sessionmaker(
     async_engine, 
@@ -19,19 +23,42 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
-Base = declarative_base()
 
+class Base(DeclarativeBase):
+    """Declarative base for all ORM models"""
 
-def get_db():
-    """Dependency for sync database sessions"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+# Shared Redis client (connections are pooled and opened lazily)
+redis_client = redis.from_url(settings.redis_url, decode_responses=True)
 
+
+@asynccontextmanager
 async def get_async_db():
-    """Dependency for async database sessions"""
+    """Async database session from the shared engine pool"""
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# Cached JSON bodies of the admin list endpoints
+ADMIN_CACHE_KEYS = ("admin:users", "admin:payments")
+
+
+async def invalidate_admin_cache():
+    """Drop cached admin listings after users or payments change"""
+    await redis_client.delete(*ADMIN_CACHE_KEYS)
+
+
+# Snapshot keys removed per DELETE when many users change at once
+_SNAPSHOT_INVALIDATE_BATCH = 1000
+
+
+def user_snapshot_key(telegram_id: int) -> str:
+    """Redis key of the cached UserSnapshot the bot's menus read"""
+    return f"ubyTG:{telegram_id}"
+
+
+async def invalidate_user_snapshots(telegram_ids):
+    """Drop cached user snapshots after a committed change to their columns"""
+    keys = [user_snapshot_key(telegram_id) for telegram_id in telegram_ids]
+    for start in range(0, len(keys), _SNAPSHOT_INVALIDATE_BATCH):
+        await redis_client.delete(*keys[start:start + _SNAPSHOT_INVALIDATE_BATCH])
@@ -1,35 +1,311 @@
 import asyncio
+import hashlib
 import logging
-from datetime import datetime, timedelta
+import re
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache, wraps
+from types import MappingProxyType
+from datetime import datetime, time, timedelta
 from typing import Dict, Any, Optional
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, LabeledPrice
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler,
-    PreCheckoutQueryHandler, filters, ContextTypes
+    PreCheckoutQueryHandler, filters, ContextTypes, BaseRateLimiter
 )
 
 from src.config import settings, SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE
-from src.models import User, Horoscope, TarotReading, Payment
-from src.services.ai_service import ai_service
+from src.models import User, UserSnapshot, USER_SNAPSHOT_COLUMNS, Payment
+from src.services.ai_service import get_ai_service
 from src.services.astrology_service import astrology_service
-from src.services.tarot_service import tarot_service
 from src.services.numerology_service import numerology_service
-from src.database import get_async_db
+from src.database import (
+    get_async_db, redis_client, invalidate_admin_cache,
+    invalidate_user_snapshots, user_snapshot_key
+)
+from src.tasks import deliver_horoscope, deliver_tarot_reading, deliver_natal_chart
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update as sql_update
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for the telegram_id -> User.id cache
+_USER_CACHE_MAX = 10_000
+
+# The only update types we have handlers for (successful payments arrive as messages)
+_ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY, Update.PRE_CHECKOUT_QUERY]
+
+# Accepted birth date formats; _DATE_RE covers all of them in a single match
+_DATE_FORMATS = (
+    "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y",
+    "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d",
+    "%m/%d/%Y", "%m-%d-%Y", "%m.%d.%Y"
+)
+_DATE_RE = re.compile(r'^(\d{1,4})([./-])(\d{1,2})\2(\d{1,4})$')
+_TIME_RE = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+# Conversation states expire after 30 minutes of inactivity
+_USER_STATE_TTL = 1800
+
+# Replies that skip an optional step, decline a tarot question or leave AI chat
+_SKIP_WORDS = frozenset({"skip", "пропустить", "saltar"})
+_NO_WORDS = frozenset({"no", "нет", "skip"})
+_EXIT_WORDS = frozenset({"exit", "выход", "salir"})
+
+# Geocoded places are shared between users and kept for 30 days
+_GEOCODE_TTL = 30 * 24 * 3600
+
+# Per-user token bucket: bursts of 5 updates, refilled at 20 per minute
+_RATE_LIMIT_BURST = 5
+_RATE_LIMIT_PER_SECOND = 20 / 60
+
+# Updates processed at once, counting webhook updates and spawned per-chat
+# commands; the rest wait for a slot
+_MAX_PENDING_UPDATES = 500
+
+# Seconds shutdown waits for in-flight handlers to finish
+_SHUTDOWN_GRACE = 10
+
+# Refills and takes one token atomically; uses the Redis clock so all bot
+# processes agree on elapsed time. Returns 1 when the update may proceed.
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return allowed
+"""
+
+# Seconds a menu may show a cached UserSnapshot: in process memory, then from
+# the Redis copy shared by all bot processes
+_SNAPSHOT_TTL = 60
+_SNAPSHOT_REDIS_TTL = 300
+
+# Session.info key collecting the telegram_ids whose snapshot a transaction changes
+_STALE_SNAPSHOTS = "stale_user_snapshots"
+
+# Session.info flag set when a transaction adds a user the admin listings must show
+_ADMIN_CACHE_STALE = "admin_cache_stale"
+
+# Session.info key collecting the (task, args) Celery jobs to send once a transaction commits
+_PENDING_JOBS = "pending_jobs"
+
+# Localized bot texts
+_TEXTS = {
+    "en": {
+        "main_menu_greeting": "Hello {name}! 🌟\n\nWhat would you like to explore today?",
+        "birth_date_request": "Please enter your birth date (DD.MM.YYYY or DD/MM/YYYY):",
+        "birth_time_request": "Please enter your birth time (HH:MM) or type 'skip' if unknown:",
+        "birth_place_request": "Please enter your birth place (city, country) or share your location:",
+        "invalid_date": "Invalid date format. Please use DD.MM.YYYY or DD/MM/YYYY format.",
+        "invalid_time": "Invalid time format. Please use HH:MM format or type 'skip'.",
+        "onboarding_complete": "Great! Your profile is now complete. Let's explore your astrological insights!",
+        "feature_not_available": "This feature is available for premium subscribers only. Use /subscribe to upgrade!",
+        "daily_limit_reached": "You've reached your daily limit for this feature. Upgrade to premium for unlimited access!",
+        "generating_horoscope": "✨ Generating your personalized horoscope...",
+        "generating_tarot": "🔮 Drawing your tarot cards...",
+        "generating_natal": "🪐 Calculating your natal chart...",
+        "generating_numerology": "🔢 Calculating your numerology reading...",
+        "error_occurred": "Sorry, an error occurred. Please try again later.",
+        "rate_limited": "You're sending requests too quickly. Please wait a moment."
+    },
+    "ru": {
+        "main_menu_greeting": "Привет, {name}! 🌟\n\nЧто бы вы хотели изучить сегодня?",
+        "birth_date_request": "Пожалуйста, введите дату рождения (ДД.ММ.ГГГГ или ДД/ММ/ГГГГ):",
+        "birth_time_request": "Пожалуйста, введите время рождения (ЧЧ:ММ) или напишите 'пропустить', если неизвестно:",
+        "birth_place_request": "Пожалуйста, введите место рождения (город, страна) или поделитесь местоположением:",
+        "invalid_date": "Неверный формат даты. Используйте формат ДД.ММ.ГГГГ или ДД/ММ/ГГГГ.",
+        "invalid_time": "Неверный формат времени. Используйте формат ЧЧ:ММ или напишите 'пропустить'.",
+        "onboarding_complete": "Отлично! Ваш профиль теперь заполнен. Давайте изучим ваши астрологические прозрения!",
+        "feature_not_available": "Эта функция доступна только для премиум-подписчиков. Используйте /subscribe для обновления!",
+        "daily_limit_reached": "Вы достигли дневного лимита для этой функции. Обновитесь до премиум для неограниченного доступа!",
+        "generating_horoscope": "✨ Генерирую ваш персональный гороскоп...",
+        "generating_tarot": "🔮 Тяну ваши карты Таро...",
+        "generating_natal": "🪐 Рассчитываю вашу натальную карту...",
+        "generating_numerology": "🔢 Рассчитываю ваше нумерологическое чтение...",
+        "error_occurred": "Извините, произошла ошибка. Попробуйте позже.",
+        "rate_limited": "Слишком много запросов. Пожалуйста, подождите немного."
+    },
+    "es": {
+        "main_menu_greeting": "¡Hola {name}! 🌟\n\n¿Qué te gustaría explorar hoy?",
+        "birth_date_request": "Por favor, ingresa tu fecha de nacimiento (DD.MM.AAAA o DD/MM/AAAA):",
+        "birth_time_request": "Por favor, ingresa tu hora de nacimiento (HH:MM) o escribe 'saltar' si no la sabes:",
+        "birth_place_request": "Por favor, ingresa tu lugar de nacimiento (ciudad, país) o comparte tu ubicación:",
+        "invalid_date": "Formato de fecha inválido. Usa el formato DD.MM.AAAA o DD/MM/AAAA.",
+        "invalid_time": "Formato de hora inválido. Usa el formato HH:MM o escribe 'saltar'.",
+        "onboarding_complete": "¡Genial! Tu perfil está ahora completo. ¡Exploremos tus percepciones astrológicas!",
+        "feature_not_available": "Esta función está disponible solo para suscriptores premium. ¡Usa /subscribe para actualizar!",
+        "daily_limit_reached": "Has alcanzado tu límite diario para esta función. ¡Actualiza a premium para acceso ilimitado!",
+        "generating_horoscope": "✨ Generando tu horóscopo personalizado...",
+        "generating_tarot": "🔮 Sacando tus cartas de tarot...",
+        "generating_natal": "🪐 Calculando tu carta natal...",
+        "generating_numerology": "🔢 Calculando tu lectura numerológica...",
+        "error_occurred": "Lo siento, ocurrió un error. Inténtalo más tarde.",
+        "rate_limited": "Estás enviando solicitudes demasiado rápido. Espera un momento."
+    }
+}
+
+# Static replies, rendered once at import
+_HELP_TEXT = """
+🌟 AstrologerBot Help
+
+Available commands:
+/start - Start the bot and setup profile
+/horoscope - Get your daily horoscope
+/tarot - Get a tarot reading
+/natal - View your natal chart
+/numerology - Get numerology insights
+/subscribe - Upgrade to premium
+/settings - Change your preferences
+/profile - View your profile
+
+Features:
+✨ Personalized horoscopes
+🔮 AI-powered tarot readings
+🪐 Professional natal charts
+🔢 Detailed numerology
+💬 AI astrologer chat (Premium)
+
+Need help? Just ask me anything!
+        """
+
+_SUBSCRIPTION_TEXT = """💎 Premium Subscription
+
+Unlock all features:
+✨ Unlimited daily horoscopes
+🔮 Unlimited tarot readings
+🪐 Detailed natal charts
+🔢 Complete numerology reports
+💬 AI astrologer chat
+📊 Advanced insights
+
+Choose your plan:"""
+
+# Flat (key, language) -> text table used for lookups
+_TRANSLATIONS = MappingProxyType({
+    (key, language): text
+    for language, texts in _TEXTS.items()
+    for key, text in texts.items()
+})
+
+
+def _user_state_key(telegram_id: int) -> str:
+    return f"state:{telegram_id}"
+
+
+def _request_key(*parts) -> str:
+    """Stable digest of an AI request's inputs, used to coalesce duplicates"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class TokenBucket:
+    """Async token bucket: at most `rate` acquisitions per `per` seconds"""
+    
+    def __init__(self, rate: float = 28, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = rate
+        self._updated = None
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    refill = (now - self._updated) * self.rate / self.per
+                    self._tokens = min(self.rate, self._tokens + refill)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+
+class BotRateLimiter(BaseRateLimiter):
+    """Passes every outgoing Bot API request through a shared TokenBucket.
+    
+    getUpdates is exempt: it only fetches updates and must not wait behind sends.
+    """
+    
+    def __init__(self, bucket: TokenBucket):
+        self._bucket = bucket
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+    
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint != "getUpdates":
+            await self._bucket.acquire()
+        return await callback(*args, **kwargs)
+
+
+def _per_chat(handler):
+    """Run a command in a background task so slow work doesn't block other chats.
+    
+    Updates of the same chat still run one after another, in arrival order.
+    """
+    @wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        self._spawn(update.effective_chat.id, handler(self, update, context))
+    return wrapper
+
 
 class AstrologerBot:
-    def __init__(self):
+    def __init__(self, user_cache_size: Optional[int] = _USER_CACHE_MAX):
         self.application = None
-        self.user_states = {}  # Store user conversation states
+        self.redis = None  # Conversation states live in Redis, see get_user_state
+        
+        # Resolved User.id per telegram_id, so returning users are loaded by primary key
+        self._user_cache: "OrderedDict[int, int]" = OrderedDict()
+        self._user_cache_size = user_cache_size
+        
+        # Read-only UserSnapshot per telegram_id for menu callbacks, with its expiry time
+        self._snapshot_cache: "OrderedDict[int, tuple]" = OrderedDict()
+        
+        # Per-chat locks for spawned commands; a lock is dropped once no task holds or awaits it
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_lock_refs: Dict[int, int] = {}
+        self._background_tasks: set = set()
+        
+        # In-flight AI calls by request key, shared by concurrent identical requests
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Telegram allows ~30 messages/s per bot; every Bot API call of the
+        # application is shaped below that instead of hitting 429s
+        self._send_bucket = TokenBucket(rate=28, per=1.0)
+        
+        # Bounds webhook updates and spawned commands being processed in the background
+        self._update_slots = asyncio.Semaphore(_MAX_PENDING_UPDATES)
         
     async def initialize(self):
         """Initialize the bot application"""
-        self.application = Application.builder().token(settings.telegram_bot_token).build()
+        self.application = (
+            Application.builder()
+            .token(settings.telegram_bot_token)
+            # Handle updates concurrently; per-chat ordering is kept by _per_chat
+            .concurrent_updates(True)
+            .rate_limiter(BotRateLimiter(self._send_bucket))
+            .build()
+        )
+        self.redis = redis_client
+        self._rate_limit_script = self.redis.register_script(_TOKEN_BUCKET_LUA)
         
         # Add handlers
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -52,16 +328,90 @@ class AstrologerBot:
         # Payment handlers
         self.application.add_handler(PreCheckoutQueryHandler(self.precheckout_callback))
         
+        # Callback dispatch tables; exact matches are checked before prefixes
+        self._db_callbacks = {
+            "horoscope_daily": self.handle_daily_horoscope,
+            "natal_chart": self.handle_natal_chart,
+            "numerology": self.handle_numerology,
+        }
+        self._menu_callbacks = {
+            "tarot_menu": self.show_tarot_menu,
+            "ai_chat": self.start_ai_chat,
+            "settings": self.show_settings,
+            "subscribe": self.show_subscription_options,
+            "back_main": self.show_main_menu,
+        }
+        self._prefix_callbacks = (
+            ("lang_", self.handle_language_selection),
+            ("tarot_", self.handle_tarot_selection),
+        )
+        
+        # Conversation step -> text message handler
+        self._step_handlers = {
+            "birth_date": self.handle_birth_date_input,
+            "birth_time": self.handle_birth_time_input,
+            "birth_place": self.handle_birth_place_input,
+            "ai_chat": self.handle_ai_chat_message,
+            "tarot_question": self.handle_tarot_question,
+        }
+        
+        # Static keyboards are built once and reused for every render
+        self._main_menu_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🌟 Daily Horoscope", callback_data="horoscope_daily")],
+            [InlineKeyboardButton("🔮 Tarot Reading", callback_data="tarot_menu")],
+            [InlineKeyboardButton("🪐 Natal Chart", callback_data="natal_chart")],
+            [InlineKeyboardButton("🔢 Numerology", callback_data="numerology")],
+            [InlineKeyboardButton("💬 Ask AI", callback_data="ai_chat")],
+            [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
+            [InlineKeyboardButton("💎 Subscribe", callback_data="subscribe")]
+        ])
+        self._tarot_menu_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🃏 Single Card", callback_data="tarot_single")],
+            [InlineKeyboardButton("🔮 Three Cards", callback_data="tarot_three")],
+            [InlineKeyboardButton("💕 Relationship", callback_data="tarot_relationship")],
+            [InlineKeyboardButton("💼 Career", callback_data="tarot_career")],
+            [InlineKeyboardButton("🌟 Celtic Cross", callback_data="tarot_celtic")],
+            [InlineKeyboardButton("🏠 Back", callback_data="back_main")]
+        ])
+        self._settings_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🌍 Change Language", callback_data="settings_language")],
+            [InlineKeyboardButton("⏰ Horoscope Time", callback_data="settings_time")],
+            [InlineKeyboardButton("👤 Edit Profile", callback_data="settings_profile")],
+            [InlineKeyboardButton("🏠 Back", callback_data="back_main")]
+        ])
+        self._subscription_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("💎 Monthly - $9.90", callback_data="sub_monthly")],
+            [InlineKeyboardButton("💎 Yearly - $99.00", callback_data="sub_yearly")],
+            [InlineKeyboardButton("🏠 Back", callback_data="back_main")]
+        ])
+        self._language_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton(name, callback_data=f"lang_{code}")]
+            for code, name in SUPPORTED_LANGUAGES.items()
+        ])
+        self._main_back_markup = InlineKeyboardMarkup(
+            [[InlineKeyboardButton("🏠 Main Menu", callback_data="back_main")]]
+        )
+        
         logger.info("Bot initialized successfully")
     
     async def get_or_create_user(self, telegram_user, db: AsyncSession) -> User:
-        """Get existing user or create new one"""
+        """Get existing user or create new one (the caller owns the transaction)"""
         try:
+            user = None
+            
+            # Returning users: primary key lookup through the session identity map
+            cached_id = self._user_cache.get(telegram_user.id)
+            if cached_id is not None:
+                user = await db.get(User, cached_id)
+                if user:
+                    self._user_cache.move_to_end(telegram_user.id)
+                    return user
+                self._user_cache.pop(telegram_user.id, None)
+            
             # Try to get existing user
-            result = await db.execute(
+            user = await db.scalar(
                 select(User).where(User.telegram_id == telegram_user.id)
             )
-            user = result.scalar_one_or_none()
             
             if not user:
                 # Create new user
@@ -73,21 +423,209 @@ class AstrologerBot:
                     language_code=telegram_user.language_code or DEFAULT_LANGUAGE
                 )
                 db.add(user)
-                await db.commit()
-                await db.refresh(user)
-                logger.info(f"Created new user: {user.telegram_id}")
+                # Assign the primary key; the caller's transaction commits the row
+                await db.flush()
+                # Admin listings are dropped once the row is committed
+                db.info[_ADMIN_CACHE_STALE] = True
+                logger.info("Created new user: %s", user.telegram_id)
             
+            self._cache_user_id(telegram_user.id, user.id)
             return user
             
         except Exception as e:
-            logger.error(f"Error getting/creating user: {e}")
-            await db.rollback()
+            logger.exception("Error getting/creating user: %s", e)
             raise
     
+    async def get_user_snapshot(self, telegram_user, db: AsyncSession) -> Optional[UserSnapshot]:
+        """Load the read-only columns of an existing user (None for unknown users)"""
+        result = await db.execute(
+            select(*USER_SNAPSHOT_COLUMNS).where(User.telegram_id == telegram_user.id)
+        )
+        row = result.first()
+        return UserSnapshot(*row) if row else None
+    
+    async def get_cached_user(self, telegram_user):
+        """Get a read-only view of the user, from memory, Redis or the database"""
+        snapshot = self.get_cached_snapshot(telegram_user.id)
+        if snapshot is not None:
+            return snapshot
+        
+        key = user_snapshot_key(telegram_user.id)
+        raw = await self.redis.get(key)
+        if raw:
+            snapshot = UserSnapshot.from_json(raw)
+        else:
+            async with self.user_transaction() as db:
+                snapshot = await self.get_user_snapshot(telegram_user, db)
+                if snapshot is None:
+                    # New users are created (and not cached) on first contact
+                    return await self.get_or_create_user(telegram_user, db)
+            await self.redis.set(key, snapshot.to_json(), ex=_SNAPSHOT_REDIS_TTL)
+        
+        self._remember_snapshot(snapshot)
+        return snapshot
+    
+    def mark_snapshot_stale(self, db: AsyncSession, telegram_id: int):
+        """Record that the session's transaction changes a column of the user's snapshot"""
+        db.info.setdefault(_STALE_SNAPSHOTS, set()).add(telegram_id)
+    
+    def queue_after_commit(self, db: AsyncSession, task, *args):
+        """Send a Celery job once the session's transaction has committed"""
+        db.info.setdefault(_PENDING_JOBS, []).append((task, args))
+    
+    @asynccontextmanager
+    async def user_transaction(self):
+        """Session in a transaction; once it commits, snapshots marked stale and
+        outdated admin listings are dropped and queued jobs are sent"""
+        async with get_async_db() as db:
+            async with db.begin():
+                yield db
+            stale = db.info.pop(_STALE_SNAPSHOTS, None)
+            if stale:
+                for telegram_id in stale:
+                    self._snapshot_cache.pop(telegram_id, None)
+                await invalidate_user_snapshots(stale)
+            if db.info.pop(_ADMIN_CACHE_STALE, False):
+                await invalidate_admin_cache()
+            for task, args in db.info.pop(_PENDING_JOBS, ()):
+                await asyncio.to_thread(task.delay, *args)
+    
+    def _remember_snapshot(self, snapshot: UserSnapshot):
+        """Keep a snapshot in process memory, evicting the least recently used entry"""
+        if self._user_cache_size == 0:
+            return
+        expires_at = asyncio.get_running_loop().time() + _SNAPSHOT_TTL
+        self._snapshot_cache[snapshot.telegram_id] = (snapshot, expires_at)
+        self._snapshot_cache.move_to_end(snapshot.telegram_id)
+        if self._user_cache_size is not None and len(self._snapshot_cache) > self._user_cache_size:
+            self._snapshot_cache.popitem(last=False)
+    
+    def get_cached_snapshot(self, telegram_id: int) -> Optional[UserSnapshot]:
+        """Return a fresh snapshot from process memory without any I/O"""
+        entry = self._snapshot_cache.get(telegram_id)
+        if entry is None:
+            return None
+        snapshot, expires_at = entry
+        if expires_at < asyncio.get_running_loop().time():
+            del self._snapshot_cache[telegram_id]
+            return None
+        return snapshot
+    
+    def _cache_user_id(self, telegram_id: int, user_id: int):
+        """Remember the User.id for a telegram_id, evicting the least recently used entry"""
+        if self._user_cache_size == 0:
+            return
+        self._user_cache[telegram_id] = user_id
+        self._user_cache.move_to_end(telegram_id)
+        if self._user_cache_size is not None and len(self._user_cache) > self._user_cache_size:
+            self._user_cache.popitem(last=False)
+    
+    async def get_user_state(self, telegram_id: int) -> Dict[str, str]:
+        """Get the conversation state of a user (empty when none), extending its TTL"""
+        key = _user_state_key(telegram_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(key)
+            pipe.expire(key, _USER_STATE_TTL)
+            state, _ = await pipe.execute()
+        return state
+    
+    async def set_user_state(self, telegram_id: int, **state: str):
+        """Replace the conversation state of a user"""
+        key = _user_state_key(telegram_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=state)
+            pipe.expire(key, _USER_STATE_TTL)
+            await pipe.execute()
+    
+    async def clear_user_state(self, telegram_id: int):
+        """Drop the conversation state of a user"""
+        await self.redis.delete(_user_state_key(telegram_id))
+    
+    async def geocode(self, place_text: str):
+        """Get coordinates for a place, shared through Redis across users"""
+        place_norm = place_text.strip().lower()
+        key = f"geo:{place_norm}"
+        cached = await self.redis.get(key)
+        if cached:
+            lat, lon = cached.split(",")
+            return float(lat), float(lon)
+        
+        lat, lon = await astrology_service.get_coordinates(place_norm)
+        await self.redis.set(key, f"{lat},{lon}", ex=_GEOCODE_TTL)
+        return lat, lon
+    
+    def _spawn(self, chat_id: int, coro):
+        """Schedule a handler coroutine behind the chat's lock"""
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        self._chat_lock_refs[chat_id] = self._chat_lock_refs.get(chat_id, 0) + 1
+        
+        task = asyncio.create_task(self._run_locked(chat_id, lock, coro))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    def enqueue_update(self, data: Dict[str, Any]) -> bool:
+        """Schedule a raw webhook update for processing without waiting for it.
+        
+        Returns False, scheduling nothing, when the data is not a Telegram update.
+        """
+        try:
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            logger.warning("Rejected malformed webhook update: %s", e)
+            return False
+        if update is None:
+            return False
+        task = asyncio.create_task(self._process_update(update))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return True
+    
+    async def _process_update(self, update: Update):
+        async with self._update_slots:
+            await self.application.process_update(update)
+    
+    async def _run_locked(self, chat_id: int, lock: asyncio.Lock, coro):
+        try:
+            # The slot is taken once it's this update's turn in the chat, so
+            # updates queued behind a busy chat don't hold slots
+            async with lock, self._update_slots:
+                await coro
+        except Exception as e:
+            logger.exception("Error in spawned handler: %s", e)
+        finally:
+            self._chat_lock_refs[chat_id] -= 1
+            if not self._chat_lock_refs[chat_id]:
+                del self._chat_lock_refs[chat_id]
+                del self._chat_locks[chat_id]
+    
+    async def _coalesce(self, key: str, factory):
+        """Run factory() once for all concurrent callers with the same key"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the call for the others
+        return await asyncio.shield(future)
+    
+    async def allow_update(self, telegram_id: int) -> bool:
+        """Take a token from the user's rate limit bucket (fails open if Redis is down)"""
+        try:
+            allowed = await self._rate_limit_script(
+                keys=[f"rl:{telegram_id}"], args=[_RATE_LIMIT_BURST, _RATE_LIMIT_PER_SECOND]
+            )
+        except Exception as e:
+            logger.warning("Rate limiter unavailable: %s", e)
+            return True
+        return bool(allowed)
+    
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
         try:
-            async with get_async_db() as db:
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
                 
                 # Check if user needs to complete onboarding
@@ -97,17 +635,13 @@ class AstrologerBot:
                     await self.show_main_menu(update, context, user)
                     
         except Exception as e:
-            logger.error(f"Error in start command: {e}")
+            logger.exception("Error in start command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
     async def start_onboarding(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
         """Start the onboarding process"""
         # Language selection
-        keyboard = []
-        for code, name in SUPPORTED_LANGUAGES.items():
-            keyboard.append([InlineKeyboardButton(name, callback_data=f"lang_{code}")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._language_markup
         
         welcome_text = """
 🌟 Welcome to AstrologerBot! 🌟
@@ -126,17 +660,7 @@ First, please select your preferred language:
     
     async def show_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
         """Show the main menu"""
-        keyboard = [
-            [InlineKeyboardButton("🌟 Daily Horoscope", callback_data="horoscope_daily")],
-            [InlineKeyboardButton("🔮 Tarot Reading", callback_data="tarot_menu")],
-            [InlineKeyboardButton("🪐 Natal Chart", callback_data="natal_chart")],
-            [InlineKeyboardButton("🔢 Numerology", callback_data="numerology")],
-            [InlineKeyboardButton("💬 Ask AI", callback_data="ai_chat")],
-            [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
-            [InlineKeyboardButton("💎 Subscribe", callback_data="subscribe")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._main_menu_markup
         
         greeting = self.get_text("main_menu_greeting", user.language_code).format(
             name=user.first_name or "there"
@@ -150,83 +674,82 @@ First, please select your preferred language:
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle callback queries from inline keyboards"""
         query = update.callback_query
+        if not await self.allow_update(update.effective_user.id):
+            await query.answer(self.get_text("rate_limited", update.effective_user.language_code))
+            return
         await query.answer()
         
         try:
-            async with get_async_db() as db:
+            data = query.data
+            
+            # Menus only read the user: serve them from the snapshot caches and
+            # open a session only to refill them
+            handler = self._menu_callbacks.get(data)
+            if handler:
+                user = await self.get_cached_user(update.effective_user)
+                await handler(update, context, user)
+                return
+            
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
                 
-                data = query.data
+                handler = self._db_callbacks.get(data)
+                if handler:
+                    await handler(update, context, user, db)
+                    return
                 
-                if data.startswith("lang_"):
-                    await self.handle_language_selection(update, context, user, data, db)
-                elif data == "horoscope_daily":
-                    await self.handle_daily_horoscope(update, context, user, db)
-                elif data == "tarot_menu":
-                    await self.show_tarot_menu(update, context, user)
-                elif data.startswith("tarot_"):
-                    await self.handle_tarot_selection(update, context, user, data, db)
-                elif data == "natal_chart":
-                    await self.handle_natal_chart(update, context, user, db)
-                elif data == "numerology":
-                    await self.handle_numerology(update, context, user, db)
-                elif data == "ai_chat":
-                    await self.start_ai_chat(update, context, user)
-                elif data == "settings":
-                    await self.show_settings(update, context, user)
-                elif data == "subscribe":
-                    await self.show_subscription_options(update, context, user)
-                elif data == "back_main":
-                    await self.show_main_menu(update, context, user)
-                else:
-                    await query.edit_message_text("Unknown option selected.")
+                for prefix, handler in self._prefix_callbacks:
+                    if data.startswith(prefix):
+                        await handler(update, context, user, data, db)
+                        return
+                
+                await query.edit_message_text("Unknown option selected.")
                     
         except Exception as e:
-            logger.error(f"Error handling callback: {e}")
+            logger.exception("Error handling callback: %s", e)
             await query.edit_message_text("Sorry, something went wrong. Please try again.")
     
     async def handle_language_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE, 
                                       user: User, data: str, db: AsyncSession):
         """Handle language selection during onboarding"""
         lang_code = data.split("_")[1]
-        user.language_code = lang_code
-        await db.commit()
+        if user.language_code != lang_code:
+            user.language_code = lang_code
+            self.mark_snapshot_stale(db, user.telegram_id)
         
         # Continue with birth data collection
         text = self.get_text("birth_date_request", lang_code)
         await update.callback_query.edit_message_text(text)
         
         # Set user state for birth data collection
-        self.user_states[user.telegram_id] = {"step": "birth_date"}
+        await self.set_user_state(user.telegram_id, step="birth_date")
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages"""
+        if not await self.allow_update(update.effective_user.id):
+            text = self.get_text("rate_limited", update.effective_user.language_code)
+            await update.message.reply_text(text)
+            return
+        
         try:
-            async with get_async_db() as db:
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
                 
                 # Check if user is in a specific state (onboarding, etc.)
-                user_state = self.user_states.get(user.telegram_id, {})
+                user_state = await self.get_user_state(user.telegram_id)
                 
-                if user_state.get("step") == "birth_date":
-                    await self.handle_birth_date_input(update, context, user, db)
-                elif user_state.get("step") == "birth_time":
-                    await self.handle_birth_time_input(update, context, user, db)
-                elif user_state.get("step") == "birth_place":
-                    await self.handle_birth_place_input(update, context, user, db)
-                elif user_state.get("step") == "ai_chat":
-                    await self.handle_ai_chat_message(update, context, user, db)
-                elif user_state.get("step") == "tarot_question":
-                    await self.handle_tarot_question(update, context, user, db)
-                else:
+                handler = self._step_handlers.get(user_state.get("step"))
+                if handler is None:
                     # Default: treat as AI chat if user has premium
                     if user.can_use_feature("ai_chat"):
-                        await self.handle_ai_chat_message(update, context, user, db)
+                        handler = self.handle_ai_chat_message
                     else:
                         await self.show_main_menu(update, context, user)
-                        
+                        return
+                
+                await handler(update, context, user, db)
         except Exception as e:
-            logger.error(f"Error handling message: {e}")
+            logger.exception("Error handling message: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
     async def handle_birth_date_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
@@ -242,29 +765,42 @@ First, please select your preferred language:
                 await update.message.reply_text(text)
                 return
             
-            user.birth_date = birth_date
-            await db.commit()
+            if user.birth_date != birth_date:
+                user.birth_date = birth_date
+                self.mark_snapshot_stale(db, user.telegram_id)
             
             # Ask for birth time
             text = self.get_text("birth_time_request", user.language_code)
             await update.message.reply_text(text)
             
-            self.user_states[user.telegram_id] = {"step": "birth_time"}
+            await self.set_user_state(user.telegram_id, step="birth_time")
             
         except Exception as e:
-            logger.error(f"Error handling birth date: {e}")
+            logger.exception("Error handling birth date: %s", e)
             text = self.get_text("invalid_date", user.language_code)
             await update.message.reply_text(text)
     
     def parse_date(self, date_text: str) -> Optional[datetime]:
         """Parse date from various formats"""
-        formats = [
-            "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y",
-            "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d",
-            "%m/%d/%Y", "%m-%d-%Y", "%m.%d.%Y"
-        ]
+        match = _DATE_RE.match(date_text)
+        if match:
+            first, _, second, third = match.groups()
+            try:
+                if len(first) == 4:
+                    # YYYY-MM-DD
+                    return datetime(int(first), int(second), int(third))
+                if len(third) == 4:
+                    try:
+                        # DD.MM.YYYY
+                        return datetime(int(third), int(second), int(first))
+                    except ValueError:
+                        # MM/DD/YYYY
+                        return datetime(int(third), int(first), int(second))
+            except ValueError:
+                return None
         
-        for fmt in formats:
+        # Unusual input: fall back to the full list of supported formats
+        for fmt in _DATE_FORMATS:
             try:
                 return datetime.strptime(date_text, fmt)
             except ValueError:
@@ -272,60 +808,14 @@ First, please select your preferred language:
         
         return None
     
-    def get_text(self, key: str, language: str) -> str:
-        """Get localized text"""
-        texts = {
-            "en": {
-                "main_menu_greeting": "Hello {name}! 🌟\n\nWhat would you like to explore today?",
-                "birth_date_request": "Please enter your birth date (DD.MM.YYYY or DD/MM/YYYY):",
-                "birth_time_request": "Please enter your birth time (HH:MM) or type 'skip' if unknown:",
-                "birth_place_request": "Please enter your birth place (city, country) or share your location:",
-                "invalid_date": "Invalid date format. Please use DD.MM.YYYY or DD/MM/YYYY format.",
-                "invalid_time": "Invalid time format. Please use HH:MM format or type 'skip'.",
-                "onboarding_complete": "Great! Your profile is now complete. Let's explore your astrological insights!",
-                "feature_not_available": "This feature is available for premium subscribers only. Use /subscribe to upgrade!",
-                "daily_limit_reached": "You've reached your daily limit for this feature. Upgrade to premium for unlimited access!",
-                "generating_horoscope": "✨ Generating your personalized horoscope...",
-                "generating_tarot": "🔮 Drawing your tarot cards...",
-                "generating_natal": "🪐 Calculating your natal chart...",
-                "generating_numerology": "🔢 Calculating your numerology reading...",
-                "error_occurred": "Sorry, an error occurred. Please try again later."
-            },
-            "ru": {
-                "main_menu_greeting": "Привет, {name}! 🌟\n\nЧто бы вы хотели изучить сегодня?",
-                "birth_date_request": "Пожалуйста, введите дату рождения (ДД.ММ.ГГГГ или ДД/ММ/ГГГГ):",
-                "birth_time_request": "Пожалуйста, введите время рождения (ЧЧ:ММ) или напишите 'пропустить', если неизвестно:",
-                "birth_place_request": "Пожалуйста, введите место рождения (город, страна) или поделитесь местоположением:",
-                "invalid_date": "Неверный формат даты. Используйте формат ДД.ММ.ГГГГ или ДД/ММ/ГГГГ.",
-                "invalid_time": "Неверный формат времени. Используйте формат ЧЧ:ММ или напишите 'пропустить'.",
-                "onboarding_complete": "Отлично! Ваш профиль теперь заполнен. Давайте изучим ваши астрологические прозрения!",
-                "feature_not_available": "Эта функция доступна только для премиум-подписчиков. Используйте /subscribe для обновления!",
-                "daily_limit_reached": "Вы достигли дневного лимита для этой функции. Обновитесь до премиум для неограниченного доступа!",
-                "generating_horoscope": "✨ Генерирую ваш персональный гороскоп...",
-                "generating_tarot": "🔮 Тяну ваши карты Таро...",
-                "generating_natal": "🪐 Рассчитываю вашу натальную карту...",
-                "generating_numerology": "🔢 Рассчитываю ваше нумерологическое чтение...",
-                "error_occurred": "Извините, произошла ошибка. Попробуйте позже."
-            },
-            "es": {
-                "main_menu_greeting": "¡Hola {name}! 🌟\n\n¿Qué te gustaría explorar hoy?",
-                "birth_date_request": "Por favor, ingresa tu fecha de nacimiento (DD.MM.AAAA o DD/MM/AAAA):",
-                "birth_time_request": "Por favor, ingresa tu hora de nacimiento (HH:MM) o escribe 'saltar' si no la sabes:",
-                "birth_place_request": "Por favor, ingresa tu lugar de nacimiento (ciudad, país) o comparte tu ubicación:",
-                "invalid_date": "Formato de fecha inválido. Usa el formato DD.MM.AAAA o DD/MM/AAAA.",
-                "invalid_time": "Formato de hora inválido. Usa el formato HH:MM o escribe 'saltar'.",
-                "onboarding_complete": "¡Genial! Tu perfil está ahora completo. ¡Exploremos tus percepciones astrológicas!",
-                "feature_not_available": "Esta función está disponible solo para suscriptores premium. ¡Usa /subscribe para actualizar!",
-                "daily_limit_reached": "Has alcanzado tu límite diario para esta función. ¡Actualiza a premium para acceso ilimitado!",
-                "generating_horoscope": "✨ Generando tu horóscopo personalizado...",
-                "generating_tarot": "🔮 Sacando tus cartas de tarot...",
-                "generating_natal": "🪐 Calculando tu carta natal...",
-                "generating_numerology": "🔢 Calculando tu lectura numerológica...",
-                "error_occurred": "Lo siento, ocurrió un error. Inténtalo más tarde."
-            }
-        }
-        
-        return texts.get(language, texts["en"]).get(key, texts["en"].get(key, "Text not found"))
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def get_text(key: str, language: str) -> str:
+        """Get localized text, falling back to the default language"""
+        return (
+            _TRANSLATIONS.get((key, language))
+            or _TRANSLATIONS.get((key, DEFAULT_LANGUAGE), "Text not found")
+        )
     
     async def handle_birth_time_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                     user: User, db: AsyncSession):
@@ -333,8 +823,8 @@ First, please select your preferred language:
         try:
             time_text = update.message.text.strip().lower()
             
-            if time_text in ['skip', 'пропустить', 'saltar']:
-                user.birth_time = "12:00"  # Default to noon
+            if time_text in _SKIP_WORDS:
+                user.birth_time = time(12, 0)  # Default to noon
             else:
                 # Parse time input
                 birth_time = self.parse_time(time_text)
@@ -344,16 +834,14 @@ First, please select your preferred language:
                     return
                 user.birth_time = birth_time
             
-            await db.commit()
-            
             # Ask for birth place
             text = self.get_text("birth_place_request", user.language_code)
             await update.message.reply_text(text)
             
-            self.user_states[user.telegram_id] = {"step": "birth_place"}
+            await self.set_user_state(user.telegram_id, step="birth_place")
             
         except Exception as e:
-            logger.error(f"Error handling birth time: {e}")
+            logger.exception("Error handling birth time: %s", e)
             text = self.get_text("invalid_time", user.language_code)
             await update.message.reply_text(text)
     
@@ -365,7 +853,7 @@ First, please select your preferred language:
             
             # Try to get coordinates for the place
             try:
-                lat, lon = await astrology_service.get_coordinates(place_text)
+                lat, lon = await self.geocode(place_text)
                 timezone = astrology_service.get_timezone(lat, lon)
                 
                 user.birth_place = place_text
@@ -373,110 +861,70 @@ First, please select your preferred language:
                 user.birth_longitude = lon
                 user.birth_timezone = timezone
                 
-                await db.commit()
-                
                 # Complete onboarding
                 text = self.get_text("onboarding_complete", user.language_code)
                 await update.message.reply_text(text)
                 
                 # Clear user state
-                if user.telegram_id in self.user_states:
-                    del self.user_states[user.telegram_id]
+                await self.clear_user_state(user.telegram_id)
                 
                 # Show main menu
                 await self.show_main_menu(update, context, user)
                 
             except Exception as e:
-                logger.error(f"Geocoding error: {e}")
+                logger.exception("Geocoding error: %s", e)
                 await update.message.reply_text(
                     "Could not find that location. Please try again with a different format (e.g., 'New York, USA')."
                 )
                 
         except Exception as e:
-            logger.error(f"Error handling birth place: {e}")
+            logger.exception("Error handling birth place: %s", e)
             await update.message.reply_text("Error processing location. Please try again.")
     
-    def parse_time(self, time_text: str) -> Optional[str]:
+    def parse_time(self, time_text: str) -> Optional[time]:
         """Parse time from various formats"""
-        import re
-        
         # Match HH:MM format
-        match = re.match(r'^(\d{1,2}):(\d{2})$', time_text)
+        match = _TIME_RE.match(time_text)
         if match:
             hour, minute = int(match.group(1)), int(match.group(2))
             if 0 <= hour <= 23 and 0 <= minute <= 59:
-                return f"{hour:02d}:{minute:02d}"
+                return time(hour, minute)
         
         return None
     
     async def handle_daily_horoscope(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                    user: User, db: AsyncSession):
         """Handle daily horoscope request"""
+        lang = user.language_code
         try:
             # Check if user can use this feature
             if not user.can_use_feature("daily_horoscope"):
-                text = self.get_text("daily_limit_reached", user.language_code)
+                text = self.get_text("daily_limit_reached", lang)
                 await update.callback_query.edit_message_text(text)
                 return
             
-            # Show generating message
-            text = self.get_text("generating_horoscope", user.language_code)
-            await update.callback_query.edit_message_text(text)
-            
-            # Prepare user data for horoscope generation
-            user_data = {
-                "birth_date": user.birth_date.strftime("%Y-%m-%d") if user.birth_date else None,
-                "birth_time": user.birth_time,
-                "birth_place": user.birth_place,
-                "birth_latitude": user.birth_latitude,
-                "birth_longitude": user.birth_longitude
-            }
-            
-            # Generate horoscope
-            horoscope_content = await ai_service.generate_horoscope(
-                user_data, "daily", user.language_code
+            # Increment in SQL so concurrent requests of the same user are not lost
+            await db.execute(
+                sql_update(User)
+                .where(User.id == user.id)
+                .values(daily_horoscopes_used=User.daily_horoscopes_used + 1)
             )
+            self.mark_snapshot_stale(db, user.telegram_id)
+            # Generation and delivery happen in the worker, queued once the
+            # usage above is committed; only usage is counted here
+            self.queue_after_commit(db, deliver_horoscope, user.id, update.effective_chat.id)
             
-            # Save to database
-            horoscope = Horoscope(
-                user_id=user.id,
-                horoscope_type="daily",
-                content=horoscope_content,
-                date_for=datetime.now().date(),
-                ai_model_used=settings.ai_model
-            )
-            db.add(horoscope)
-            
-            # Update user usage
-            user.daily_horoscopes_used += 1
-            await db.commit()
-            
-            # Send horoscope
-            keyboard = [[InlineKeyboardButton("🏠 Main Menu", callback_data="back_main")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await update.callback_query.edit_message_text(
-                f"🌟 Your Daily Horoscope\n\n{horoscope_content}",
-                reply_markup=reply_markup
-            )
+            text = self.get_text("generating_horoscope", lang)
+            await self._show_status(update.callback_query.edit_message_text(text))
             
         except Exception as e:
-            logger.error(f"Error generating horoscope: {e}")
-            text = self.get_text("error_occurred", user.language_code)
+            logger.exception("Error generating horoscope: %s", e)
+            text = self.get_text("error_occurred", lang)
             await update.callback_query.edit_message_text(text)
     
     async def show_tarot_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
         """Show tarot reading options"""
-        keyboard = [
-            [InlineKeyboardButton("🃏 Single Card", callback_data="tarot_single")],
-            [InlineKeyboardButton("🔮 Three Cards", callback_data="tarot_three")],
-            [InlineKeyboardButton("💕 Relationship", callback_data="tarot_relationship")],
-            [InlineKeyboardButton("💼 Career", callback_data="tarot_career")],
-            [InlineKeyboardButton("🌟 Celtic Cross", callback_data="tarot_celtic")],
-            [InlineKeyboardButton("🏠 Back", callback_data="back_main")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._tarot_menu_markup
         text = "🔮 Choose your tarot reading type:"
         
         await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
@@ -509,78 +957,65 @@ First, please select your preferred language:
             await update.callback_query.edit_message_text(text)
             
             # Set user state
-            self.user_states[user.telegram_id] = {
-                "step": "tarot_question",
-                "spread_type": actual_spread
-            }
+            await self.set_user_state(
+                user.telegram_id, step="tarot_question", spread_type=actual_spread
+            )
             
         except Exception as e:
-            logger.error(f"Error handling tarot selection: {e}")
+            logger.exception("Error handling tarot selection: %s", e)
             text = self.get_text("error_occurred", user.language_code)
             await update.callback_query.edit_message_text(text)
     
     async def handle_tarot_question(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                   user: User, db: AsyncSession):
         """Handle tarot question input"""
+        lang = user.language_code
         try:
             question_text = update.message.text.strip()
-            user_state = self.user_states.get(user.telegram_id, {})
+            user_state = await self.get_user_state(user.telegram_id)
             spread_type = user_state.get("spread_type", "single")
             
-            question = None if question_text.lower() in ['no', 'нет', 'skip'] else question_text
-            
-            # Show generating message
-            text = self.get_text("generating_tarot", user.language_code)
-            await update.message.reply_text(text)
+            question = None if question_text.lower() in _NO_WORDS else question_text
             
-            # Create tarot reading
-            reading = tarot_service.create_reading(spread_type, question)
-            
-            # Generate AI interpretation
-            interpretation = await ai_service.generate_tarot_interpretation(
-                reading["cards"], spread_type, question, user.language_code
+            await db.execute(
+                sql_update(User)
+                .where(User.id == user.id)
+                .values(weekly_tarot_readings_used=User.weekly_tarot_readings_used + 1)
             )
-            
-            # Save to database
-            tarot_reading = TarotReading(
-                user_id=user.id,
-                reading_type=spread_type,
-                question=question,
-                cards_drawn=reading["cards"],
-                interpretation=interpretation,
-                ai_model_used=settings.ai_model
+            self.mark_snapshot_stale(db, user.telegram_id)
+            # The worker draws the cards, interprets and sends the reading once
+            # the usage above is committed
+            self.queue_after_commit(
+                db, deliver_tarot_reading, user.id, update.message.chat_id,
+                spread_type, question, lang
             )
-            db.add(tarot_reading)
-            
-            # Update user usage
-            user.weekly_tarot_readings_used += 1
-            await db.commit()
-            
-            # Format and send reading
-            cards_text = tarot_service.format_reading_for_display(reading)
-            full_text = f"{cards_text}\n\n🔮 Interpretation:\n{interpretation}"
             
-            keyboard = [[InlineKeyboardButton("🏠 Main Menu", callback_data="back_main")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await update.message.reply_text(full_text, reply_markup=reply_markup)
+            text = self.get_text("generating_tarot", lang)
+            await self._show_status(update.message.reply_text(text))
             
             # Clear user state
-            if user.telegram_id in self.user_states:
-                del self.user_states[user.telegram_id]
+            await self.clear_user_state(user.telegram_id)
                 
         except Exception as e:
-            logger.error(f"Error handling tarot question: {e}")
-            text = self.get_text("error_occurred", user.language_code)
+            logger.exception("Error handling tarot question: %s", e)
+            text = self.get_text("error_occurred", lang)
             await update.message.reply_text(text)
     
+    async def _show_status(self, message_call):
+        """Show a progress message; failing to show it doesn't undo the queued job"""
+        try:
+            await message_call
+        except Exception as e:
+            logger.warning("Could not show status message: %s", e)
+    
     async def handle_natal_chart(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                user: User, db: AsyncSession):
         """Handle natal chart request"""
+        lang = user.language_code
         try:
             # Check if user can use this feature
             if not user.can_use_feature("natal_chart"):
-                text = self.get_text("feature_not_available", user.language_code)
+                text = self.get_text("feature_not_available", lang)
                 await update.callback_query.edit_message_text(text)
                 return
             
@@ -590,45 +1025,26 @@ First, please select your preferred language:
                 await update.callback_query.edit_message_text(text)
                 return
             
-            # Show generating message
-            text = self.get_text("generating_natal", user.language_code)
-            await update.callback_query.edit_message_text(text)
-            
-            # Calculate natal chart
-            birth_datetime = datetime.combine(
-                user.birth_date.date(),
-                datetime.strptime(user.birth_time, "%H:%M").time()
-            )
-            
-            chart_data = astrology_service.calculate_natal_chart(
-                birth_datetime, user.birth_latitude, user.birth_longitude
-            )
+            # Chart calculation and interpretation happen in the worker, queued
+            # once the transaction commits
+            self.queue_after_commit(db, deliver_natal_chart, user.id, update.effective_chat.id)
             
-            # Generate AI interpretation
-            interpretation = await ai_service.generate_natal_chart_interpretation(
-                chart_data, user.language_code
-            )
-            
-            # Format response
-            response_text = f"🪐 Your Natal Chart\n\n{interpretation}"
-            
-            keyboard = [[InlineKeyboardButton("🏠 Main Menu", callback_data="back_main")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await update.callback_query.edit_message_text(response_text, reply_markup=reply_markup)
+            text = self.get_text("generating_natal", lang)
+            await self._show_status(update.callback_query.edit_message_text(text))
             
         except Exception as e:
-            logger.error(f"Error handling natal chart: {e}")
-            text = self.get_text("error_occurred", user.language_code)
+            logger.exception("Error handling natal chart: %s", e)
+            text = self.get_text("error_occurred", lang)
             await update.callback_query.edit_message_text(text)
     
     async def handle_numerology(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                               user: User, db: AsyncSession):
         """Handle numerology request"""
+        lang = user.language_code
         try:
             # Check if user can use this feature
             if not user.can_use_feature("numerology"):
-                text = self.get_text("feature_not_available", user.language_code)
+                text = self.get_text("feature_not_available", lang)
                 await update.callback_query.edit_message_text(text)
                 return
             
@@ -638,32 +1054,39 @@ First, please select your preferred language:
                 await update.callback_query.edit_message_text(text)
                 return
             
-            # Show generating message
-            text = self.get_text("generating_numerology", user.language_code)
-            await update.callback_query.edit_message_text(text)
-            
-            # Calculate numerology
-            full_name = user.full_name
-            reading = numerology_service.create_full_reading(full_name, user.birth_date)
-            
-            # Generate AI interpretation
-            interpretation = await ai_service.generate_numerology_reading(
-                reading["numbers"], user.birth_date.strftime("%Y-%m-%d"), 
-                full_name, user.language_code
-            )
+            # Show generating message while the reading is calculated
+            text = self.get_text("generating_numerology", lang)
+            status = asyncio.create_task(update.callback_query.edit_message_text(text))
+            try:
+                # Calculate numerology
+                full_name = user.full_name
+                reading = await asyncio.to_thread(
+                    numerology_service.create_full_reading, full_name, user.birth_date
+                )
+                
+                # Generate AI interpretation
+                numbers = reading["numbers"]
+                interpretation = await self._coalesce(
+                    _request_key("numerology", sorted(numbers.items()), user.birth_date_iso, full_name, lang),
+                    lambda: get_ai_service().generate_numerology_reading(
+                        numbers, user.birth_date_iso, full_name, lang
+                    )
+                )
+            finally:
+                # The final edit must land after the status edit
+                await status
             
             # Format response
             basic_reading = numerology_service.format_reading_for_display(reading)
             response_text = f"{basic_reading}\n\n🔮 AI Interpretation:\n{interpretation}"
             
-            keyboard = [[InlineKeyboardButton("🏠 Main Menu", callback_data="back_main")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = self._main_back_markup
             
             await update.callback_query.edit_message_text(response_text, reply_markup=reply_markup)
             
         except Exception as e:
-            logger.error(f"Error handling numerology: {e}")
-            text = self.get_text("error_occurred", user.language_code)
+            logger.exception("Error handling numerology: %s", e)
+            text = self.get_text("error_occurred", lang)
             await update.callback_query.edit_message_text(text)
     
     async def start_ai_chat(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
@@ -677,7 +1100,7 @@ First, please select your preferred language:
         await update.callback_query.edit_message_text(text)
         
         # Set user state
-        self.user_states[user.telegram_id] = {"step": "ai_chat"}
+        await self.set_user_state(user.telegram_id, step="ai_chat")
     
     async def handle_ai_chat_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                    user: User, db: AsyncSession):
@@ -685,48 +1108,41 @@ First, please select your preferred language:
         try:
             message_text = update.message.text.strip()
             
-            if message_text.lower() in ['exit', 'выход', 'salir']:
+            if message_text.lower() in _EXIT_WORDS:
                 # Clear user state and return to main menu
-                if user.telegram_id in self.user_states:
-                    del self.user_states[user.telegram_id]
+                await self.clear_user_state(user.telegram_id)
                 await self.show_main_menu(update, context, user)
                 return
             
             # Prepare user context
             user_context = {
-                "birth_date": user.birth_date.strftime("%Y-%m-%d") if user.birth_date else None,
-                "birth_time": user.birth_time,
+                "birth_date": user.birth_date_iso,
+                "birth_time": user.birth_time_str,
                 "birth_place": user.birth_place
             }
             
             # Generate AI response
-            response = await ai_service.chat_response(
-                message_text, user_context, user.language_code
+            response = await self._coalesce(
+                _request_key("chat", message_text, sorted(user_context.items()), user.language_code),
+                lambda: get_ai_service().chat_response(message_text, user_context, user.language_code)
             )
             
             await update.message.reply_text(response)
             
         except Exception as e:
-            logger.error(f"Error in AI chat: {e}")
+            logger.exception("Error in AI chat: %s", e)
             text = self.get_text("error_occurred", user.language_code)
             await update.message.reply_text(text)
     
     async def show_settings(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
         """Show user settings"""
-        keyboard = [
-            [InlineKeyboardButton("🌍 Change Language", callback_data="settings_language")],
-            [InlineKeyboardButton("⏰ Horoscope Time", callback_data="settings_time")],
-            [InlineKeyboardButton("👤 Edit Profile", callback_data="settings_profile")],
-            [InlineKeyboardButton("🏠 Back", callback_data="back_main")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._settings_markup
         
         status = "Premium ✨" if user.is_premium else "Free"
         text = f"""⚙️ Settings
 
 👤 Profile: {user.full_name}
-📅 Birth Date: {user.birth_date.strftime('%d.%m.%Y') if user.birth_date else 'Not set'}
+📅 Birth Date: {user.birth_date_display or 'Not set'}
 🌍 Language: {SUPPORTED_LANGUAGES.get(user.language_code, 'Unknown')}
 ⏰ Daily Horoscope: {user.preferred_horoscope_time}
 💎 Status: {status}
@@ -737,127 +1153,94 @@ Choose what you'd like to change:"""
     
     async def show_subscription_options(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
         """Show subscription options"""
-        keyboard = [
-            [InlineKeyboardButton("💎 Monthly - $9.90", callback_data="sub_monthly")],
-            [InlineKeyboardButton("💎 Yearly - $99.00", callback_data="sub_yearly")],
-            [InlineKeyboardButton("🏠 Back", callback_data="back_main")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        text = """💎 Premium Subscription
-
-Unlock all features:
-✨ Unlimited daily horoscopes
-🔮 Unlimited tarot readings
-🪐 Detailed natal charts
-🔢 Complete numerology reports
-💬 AI astrologer chat
-📊 Advanced insights
-
-Choose your plan:"""
-        
-        await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
+        await update.callback_query.edit_message_text(
+            _SUBSCRIPTION_TEXT, reply_markup=self._subscription_markup
+        )
     
     # Command handlers
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
-        help_text = """
-🌟 AstrologerBot Help
-
-Available commands:
-/start - Start the bot and setup profile
-/horoscope - Get your daily horoscope
-/tarot - Get a tarot reading
-/natal - View your natal chart
-/numerology - Get numerology insights
-/subscribe - Upgrade to premium
-/settings - Change your preferences
-/profile - View your profile
-
-Features:
-✨ Personalized horoscopes
-🔮 AI-powered tarot readings
-🪐 Professional natal charts
-🔢 Detailed numerology
-💬 AI astrologer chat (Premium)
-
-Need help? Just ask me anything!
-        """
-        await update.message.reply_text(help_text)
+        await update.message.reply_text(_HELP_TEXT)
     
+    @_per_chat
     async def horoscope_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /horoscope command"""
         try:
-            async with get_async_db() as db:
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
                 await self.handle_daily_horoscope(update, context, user, db)
         except Exception as e:
-            logger.error(f"Error in horoscope command: {e}")
+            logger.exception("Error in horoscope command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
+    @_per_chat
     async def tarot_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /tarot command"""
         try:
-            async with get_async_db() as db:
-                user = await self.get_or_create_user(update.effective_user, db)
-                await self.show_tarot_menu(update, context, user)
+            # Read-only: no session unless the user snapshot has to be reloaded
+            user = await self.get_cached_user(update.effective_user)
+            await self.show_tarot_menu(update, context, user)
         except Exception as e:
-            logger.error(f"Error in tarot command: {e}")
+            logger.exception("Error in tarot command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
+    @_per_chat
     async def natal_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /natal command"""
         try:
-            async with get_async_db() as db:
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
                 await self.handle_natal_chart(update, context, user, db)
         except Exception as e:
-            logger.error(f"Error in natal command: {e}")
+            logger.exception("Error in natal command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
+    @_per_chat
     async def numerology_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /numerology command"""
         try:
-            async with get_async_db() as db:
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
                 await self.handle_numerology(update, context, user, db)
         except Exception as e:
-            logger.error(f"Error in numerology command: {e}")
+            logger.exception("Error in numerology command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
+    @_per_chat
     async def subscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /subscribe command"""
         try:
-            async with get_async_db() as db:
-                user = await self.get_or_create_user(update.effective_user, db)
-                await self.show_subscription_options(update, context, user)
+            # Read-only: no session unless the user snapshot has to be reloaded
+            user = await self.get_cached_user(update.effective_user)
+            await self.show_subscription_options(update, context, user)
         except Exception as e:
-            logger.error(f"Error in subscribe command: {e}")
+            logger.exception("Error in subscribe command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
+    @_per_chat
     async def settings_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /settings command"""
         try:
-            async with get_async_db() as db:
-                user = await self.get_or_create_user(update.effective_user, db)
-                await self.show_settings(update, context, user)
+            # Read-only: no session unless the user snapshot has to be reloaded
+            user = await self.get_cached_user(update.effective_user)
+            await self.show_settings(update, context, user)
         except Exception as e:
-            logger.error(f"Error in settings command: {e}")
+            logger.exception("Error in settings command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
+    @_per_chat
     async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /profile command"""
         try:
-            async with get_async_db() as db:
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
                 
                 status = "Premium ✨" if user.is_premium else "Free"
                 profile_text = f"""👤 Your Profile
 
 Name: {user.full_name}
-Birth Date: {user.birth_date.strftime('%d.%m.%Y') if user.birth_date else 'Not set'}
-Birth Time: {user.birth_time or 'Not set'}
+Birth Date: {user.birth_date_display or 'Not set'}
+Birth Time: {user.birth_time_str or 'Not set'}
 Birth Place: {user.birth_place or 'Not set'}
 Language: {SUPPORTED_LANGUAGES.get(user.language_code, 'Unknown')}
 Status: {status}
@@ -869,15 +1252,15 @@ Weekly Tarot Readings: {user.weekly_tarot_readings_used}"""
                 
                 await update.message.reply_text(profile_text)
         except Exception as e:
-            logger.error(f"Error in profile command: {e}")
+            logger.exception("Error in profile command: %s", e)
             await update.message.reply_text("Sorry, something went wrong. Please try again.")
     
     async def handle_location(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle location sharing"""
         try:
-            async with get_async_db() as db:
+            async with self.user_transaction() as db:
                 user = await self.get_or_create_user(update.effective_user, db)
-                user_state = self.user_states.get(user.telegram_id, {})
+                user_state = await self.get_user_state(user.telegram_id)
                 
                 if user_state.get("step") == "birth_place":
                     location = update.message.location
@@ -888,21 +1271,18 @@ Weekly Tarot Readings: {user.weekly_tarot_readings_used}"""
                     user.birth_timezone = astrology_service.get_timezone(location.latitude, location.longitude)
                     user.birth_place = f"Lat: {location.latitude:.2f}, Lon: {location.longitude:.2f}"
                     
-                    await db.commit()
-                    
                     # Complete onboarding
                     text = self.get_text("onboarding_complete", user.language_code)
                     await update.message.reply_text(text)
                     
                     # Clear user state
-                    if user.telegram_id in self.user_states:
-                        del self.user_states[user.telegram_id]
+                    await self.clear_user_state(user.telegram_id)
                     
                     # Show main menu
                     await self.show_main_menu(update, context, user)
                     
         except Exception as e:
-            logger.error(f"Error handling location: {e}")
+            logger.exception("Error handling location: %s", e)
             await update.message.reply_text("Error processing location. Please try again.")
     
     async def precheckout_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -911,19 +1291,34 @@ Weekly Tarot Readings: {user.weekly_tarot_readings_used}"""
         await query.answer(ok=True)
     
     async def run_webhook(self, webhook_url: str):
-        """Run bot with webhook"""
+        """Run bot with webhook; updates arrive through the API's /webhook endpoint"""
         await self.application.initialize()
         await self.application.start()
-        await self.application.updater.start_webhook(
-            listen="0.0.0.0",
-            port=8000,
-            webhook_url=webhook_url
+        await self.application.bot.set_webhook(
+            url=webhook_url,
+            allowed_updates=_ALLOWED_UPDATES
         )
     
     async def run_polling(self):
-        """Run bot with polling"""
+        """Run bot with long polling inside the already running event loop"""
         await self.application.initialize()
-        await self.application.run_polling()
+        await self.application.start()
+        await self.application.updater.start_polling(
+            timeout=30,
+            poll_interval=0.0,
+            allowed_updates=_ALLOWED_UPDATES,
+            drop_pending_updates=True
+        )
+    
+    async def stop(self):
+        """Stop fetching updates, let running handlers finish and release resources"""
+        if self.application.updater and self.application.updater.running:
+            await self.application.updater.stop()
+        if self._background_tasks:
+            await asyncio.wait(self._background_tasks, timeout=_SHUTDOWN_GRACE)
+        if self.application.running:
+            await self.application.stop()
+        await self.application.shutdown()
 
 
 # Global bot instance
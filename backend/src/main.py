@@ -1,37 +1,61 @@
 import asyncio
+import hmac
 import logging
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Depends, HTTPException, status
+import orjson
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
 from sqlalchemy import select
 
 from src.config import settings
-from src.database import Base, async_engine, get_async_db
+from src.database import Base, async_engine, get_async_db, redis_client
 from src.models import User, Payment
 from src.handlers.bot import bot
-from src.services.ai_service import ai_service
+from src.services.ai_service import get_ai_service, close_ai_service
+from src.services.payment_service import payment_service
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.log_level.upper()),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging. Records skip process/thread lookups; timestamps are left to
+# the log collector in production and only formatted in debug runs
+logging.logProcesses = False
+logging.logThreads = False
+logging.logMultiprocessing = False
+
+_log_handler = logging.StreamHandler()
+if settings.debug:
+    _log_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt="%Y-%m-%dT%H:%M:%S"
+    ))
+else:
+    _log_handler.setFormatter(logging.Formatter('%(levelname)s %(name)s %(message)s'))
+logging.basicConfig(level=getattr(logging, settings.log_level.upper()), handlers=[_log_handler])
 logger = logging.getLogger(__name__)
 
 security = HTTPBasic()
 
+# Admin credentials as bytes, encoded once for constant-time comparison
+_ADMIN_USER = settings.admin_username.encode()
+_ADMIN_PASS = settings.admin_password.encode()
+
+# Admin listings are served from Redis for this long between refreshes
+_ADMIN_CACHE_TTL = 30
+
+# Rows fetched per round trip from the server-side cursor behind admin listings
+_ADMIN_FETCH_BATCH = 500
+
 
 def verify_admin(credentials: HTTPBasicCredentials = Depends(security)):
     """Simple admin authentication."""
-    if (
-        credentials.username == settings.admin_username
-        and credentials.password == settings.admin_password
-    ):
+    # Both digests are always computed so timing doesn't reveal which part failed
+    user_ok = hmac.compare_digest(credentials.username.encode(), _ADMIN_USER)
+    pass_ok = hmac.compare_digest(credentials.password.encode(), _ADMIN_PASS)
+    if user_ok & pass_ok:
         return credentials.username
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,30 +70,45 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Astrologer Bot application...")
     
-    # Create database tables
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables created/verified")
+    # Create database tables only when asked to; the schema check takes DDL
+    # locks and catalog round-trips on every worker start
+    if settings.auto_migrate:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        logger.info("Database tables created/verified")
+    
+    # Create the AI client inside the serving event loop
+    get_ai_service()
     
     # Initialize bot
     await bot.initialize()
     logger.info("Bot initialized")
     
-    # Start bot in background task
+    # Start bot in a tracked background task so shutdown can wait for it
     if settings.telegram_webhook_url:
         # Use webhook mode
-        asyncio.create_task(bot.run_webhook(settings.telegram_webhook_url))
+        app.state.bot_task = asyncio.create_task(
+            bot.run_webhook(settings.telegram_webhook_url), name="bot-webhook"
+        )
         logger.info(f"Bot started in webhook mode: {settings.telegram_webhook_url}")
     else:
         # Use polling mode
-        asyncio.create_task(bot.run_polling())
+        app.state.bot_task = asyncio.create_task(bot.run_polling(), name="bot-polling")
         logger.info("Bot started in polling mode")
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
-    await ai_service.close()
+    try:
+        await asyncio.wait_for(app.state.bot_task, timeout=5.0)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        pass
+    except Exception as e:
+        logger.error(f"Bot startup failed: {e}")
+    await bot.stop()
+    await close_ai_service()
+    await payment_service.aclose()
     logger.info("Application shutdown complete")
 
 
@@ -78,7 +117,8 @@ app = FastAPI(
     title="Astrologer Telegram Bot API",
     description="AI-powered astrological services via Telegram bot",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -95,97 +135,125 @@ if os.path.exists(settings.static_files_path):
     app.mount("/static", StaticFiles(directory=settings.static_files_path), name="static")
 
 
+# Probe responses never change, so they are serialized once
+_ROOT_BODY = orjson.dumps({
+    "message": "Astrologer Bot API is running",
+    "version": "1.0.0",
+    "status": "active"
+})
+_HEALTH_RUNNING_BODY = orjson.dumps({"status": "healthy", "bot_status": "running"})
+_HEALTH_NOT_INITIALIZED_BODY = orjson.dumps({"status": "healthy", "bot_status": "not_initialized"})
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Astrologer Bot API is running",
-        "version": "1.0.0",
-        "status": "active"
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "bot_status": "running" if bot.application else "not_initialized"
-    }
+    body = _HEALTH_RUNNING_BODY if bot.application else _HEALTH_NOT_INITIALIZED_BODY
+    return Response(content=body, media_type="application/json")
 
 
 @app.post("/webhook")
-async def webhook_handler(request: dict):
+async def webhook_handler(request: Request):
     """Webhook endpoint for Telegram"""
     try:
         if bot.application:
-            # Process the update
-            from telegram import Update
-            update = Update.de_json(request, bot.application.bot)
-            await bot.application.process_update(update)
-            return {"status": "ok"}
+            # Parse the raw body directly, skipping FastAPI's body validation
+            try:
+                data = orjson.loads(await request.body())
+            except orjson.JSONDecodeError:
+                return ORJSONResponse(
+                    {"status": "error", "message": "Invalid JSON"},
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+            # Acknowledge right away; Telegram retries updates whose response is slow
+            if not isinstance(data, dict) or not bot.enqueue_update(data):
+                return ORJSONResponse(
+                    {"status": "error", "message": "Invalid update"},
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+            return ORJSONResponse({"status": "ok"}, status_code=200)
         else:
             return {"status": "error", "message": "Bot not initialized"}
-    except Exception as e:
-        logger.error(f"Webhook error: {e}")
-        return {"status": "error", "message": str(e)}
+    except Exception:
+        logger.exception("Webhook error")
+        return {"status": "error"}
 
 
 # -------------------- Admin Endpoints --------------------
 
 @app.post("/admin/login")
-async def admin_login(credentials: HTTPBasicCredentials = Depends(security)):
-    if (
-        credentials.username == settings.admin_username
-        and credentials.password == settings.admin_password
-    ):
-        return {"status": "ok"}
-    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+async def admin_login(admin: str = Depends(verify_admin)):
+    return {"status": "ok"}
+
 
+async def _cached_admin_response(key: str, build) -> Response:
+    """Serve a cached JSON body, rebuilding it with build() when missing"""
+    body = await redis_client.get(key)
+    if body is None:
+        body = orjson.dumps(await build())
+        await redis_client.set(key, body, ex=_ADMIN_CACHE_TTL)
+    return Response(content=body, media_type="application/json")
 
+
+async def _list_users():
+    # Plain column rows: no ORM instances, identity map or attribute state.
+    # is_premium is the User.is_premium hybrid, evaluated in SQL
+    stmt = select(
+        User.id,
+        User.telegram_id,
+        User.username,
+        User.is_premium.label("is_premium"),
+        User.created_at,
+    )
+    async with get_async_db() as db:
+        result = await db.stream(stmt.execution_options(yield_per=_ADMIN_FETCH_BATCH))
+        return [dict(row) async for row in result.mappings()]
+
+
+async def _list_payments():
+    stmt = select(
+        Payment.id,
+        Payment.user_id,
+        Payment.provider,
+        Payment.amount,
+        Payment.status,
+        Payment.paid_at,
+    )
+    async with get_async_db() as db:
+        result = await db.stream(stmt.execution_options(yield_per=_ADMIN_FETCH_BATCH))
+        return [dict(row) async for row in result.mappings()]
+
+
+# Authentication runs as a dependency, before any cached body is read
 @app.get("/admin/users")
 async def admin_users(admin: str = Depends(verify_admin)):
-    async with get_async_db() as db:
-        result = await db.execute(select(User))
-        users = result.scalars().all()
-        return [
-            {
-                "id": u.id,
-                "telegram_id": u.telegram_id,
-                "username": u.username,
-                "is_premium": u.is_premium,
-                "created_at": u.created_at,
-            }
-            for u in users
-        ]
+    return await _cached_admin_response("admin:users", _list_users)
 
 
 @app.get("/admin/payments")
 async def admin_payments(admin: str = Depends(verify_admin)):
-    async with get_async_db() as db:
-        result = await db.execute(select(Payment))
-        payments = result.scalars().all()
-        return [
-            {
-                "id": p.id,
-                "user_id": p.user_id,
-                "provider": p.provider,
-                "amount": p.amount,
-                "status": p.status,
-                "paid_at": p.paid_at,
-            }
-            for p in payments
-        ]
+    return await _cached_admin_response("admin:payments", _list_payments)
 
 
 if __name__ == "__main__":
     import uvicorn
     
-    # Run the application
+    # Run the application. Every worker process starts its own bot, so more
+    # than one worker is only safe in webhook mode
     uvicorn.run(
         "src.main:app",
         host="0.0.0.0",
         port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
         reload=settings.debug,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        access_log=False
     )
@@ -1,6 +1,6 @@
-from .user import User
+from .user import User, UserSnapshot, USER_SNAPSHOT_COLUMNS
 from .horoscope import Horoscope
 from .tarot import TarotReading
 from .payment import Payment
 
-__all__ = ["User", "Horoscope", "TarotReading", "Payment"]
+__all__ = ["User", "UserSnapshot", "USER_SNAPSHOT_COLUMNS", "Horoscope", "TarotReading", "Payment"]
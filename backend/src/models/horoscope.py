@@ -1,34 +1,45 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.database import Base
 
+if TYPE_CHECKING:
+    from .user import User
+
 
 class Horoscope(Base):
     __tablename__ = "horoscopes"
+    __table_args__ = (
+        # "Has this user got today's horoscope" and per-type date scans
+        Index("ix_horoscopes_user_date", "user_id", "date_for"),
+        Index("ix_horoscopes_type_date", "horoscope_type", "date_for"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Horoscope details
-    horoscope_type = Column(String(20), nullable=False)  # daily, weekly, monthly
-    content = Column(Text, nullable=False)
-    date_for = Column(DateTime, nullable=False)  # The date this horoscope is for
+    horoscope_type: Mapped[str] = mapped_column(String(20), nullable=False)  # daily, weekly, monthly
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    date_for: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # The date this horoscope is for
     
     # AI generation details
-    ai_model_used = Column(String(100), nullable=True)
-    generation_time = Column(DateTime, default=func.now())
+    ai_model_used: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    generation_time: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
     
     # Delivery status
-    is_delivered = Column(Boolean, default=False)
-    delivered_at = Column(DateTime, nullable=True)
+    is_delivered: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     # Metadata
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="horoscopes")
+    user: Mapped["User"] = relationship(back_populates="horoscopes", lazy="raise")
     
     def __repr__(self):
         return f"<Horoscope(user_id={self.user_id}, type={self.horoscope_type}, date_for={self.date_for})>"
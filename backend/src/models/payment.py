@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Text
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from src.database import Base
@@ -6,6 +8,11 @@ from src.database import Base
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        # Leading user_id also serves the users.id foreign key lookups
+        Index("ix_payments_user_status", "user_id", "status"),
+        Index("ix_payments_expires", "expires_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -21,7 +28,7 @@ class Payment(Base):
     subscription_months = Column(Integer, nullable=False)  # 1 for monthly, 12 for yearly
     
     # Payment status
-    status = Column(String(20), default="pending")  # pending, completed, failed, refunded
+    status = Column(String(20), default="pending", index=True)  # pending, completed, failed, refunded
     payment_method = Column(String(50), nullable=True)  # card, wallet, etc.
     
     # External references
@@ -38,7 +45,7 @@ class Payment(Base):
     extra_data = Column(Text, nullable=True)  # JSON string for additional data
     
     # Relationships
-    user = relationship("User", back_populates="payments")
+    user = relationship("User", back_populates="payments", lazy="raise")
     
     def __repr__(self):
         return f"<Payment(payment_id={self.payment_id}, user_id={self.user_id}, status={self.status})>"
@@ -52,6 +59,4 @@ class Payment(Base):
         """Check if this payment represents an active subscription"""
         if not self.is_successful or not self.expires_at:
             return False
-        
-        from datetime import datetime
         return datetime.utcnow() < self.expires_at
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from src.database import Base
@@ -6,14 +8,23 @@ from src.database import Base
 
 class TarotReading(Base):
     __tablename__ = "tarot_readings"
+    __table_args__ = (
+        # Containment searches on drawn cards, e.g. cards_drawn @> '[{"name": "The Fool"}]'
+        Index(
+            "ix_tarot_readings_cards_drawn", "cards_drawn",
+            postgresql_using="gin",
+            postgresql_ops={"cards_drawn": "jsonb_path_ops"}
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # Reading details
     reading_type = Column(String(20), nullable=False)  # single, three_card, celtic_cross
     question = Column(Text, nullable=True)  # User's question
-    cards_drawn = Column(JSON, nullable=False)  # List of card names and positions
+    # List of card names and positions; binary JSONB on PostgreSQL, plain JSON elsewhere
+    cards_drawn = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
     interpretation = Column(Text, nullable=False)  # AI-generated interpretation
     
     # AI generation details
@@ -25,18 +36,23 @@ class TarotReading(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="tarot_readings")
+    user = relationship("User", back_populates="tarot_readings", lazy="raise")
     
     def __repr__(self):
         return f"<TarotReading(user_id={self.user_id}, type={self.reading_type}, cards={len(self.cards_drawn)})>"
     
-    @property
+    @hybrid_property
     def card_names(self):
         """Get list of card names from the cards_drawn JSON"""
         if isinstance(self.cards_drawn, list):
             return [card.get('name', '') for card in self.cards_drawn]
         return []
     
+    @card_names.expression
+    def card_names(cls):
+        # PostgreSQL only: JSON array of names, extracted without loading rows into Python
+        return func.jsonb_path_query_array(cls.cards_drawn, "$[*].name")
+    
     @property
     def formatted_cards(self):
         """Get formatted string of cards for display"""
@@ -1,14 +1,95 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, JSON
+import json
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, time, timedelta
+from functools import cached_property
+from typing import Optional
+
+from sqlalchemy import Column, Computed, Integer, BigInteger, SmallInteger, String, DateTime, Boolean, Float, Text, JSON, Time, Index, and_, case, or_, text, update
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from src.config import SUBSCRIPTION_TIERS
 from src.database import Base
 
 
-class User(Base):
+def _feature_rules(limits):
+    """feature -> (usage counter attribute or None, limit); -1 means unlimited"""
+    return {
+        "daily_horoscope": ("daily_horoscopes_used", limits["daily_horoscopes"]),
+        "tarot_reading": ("weekly_tarot_readings_used", limits["tarot_readings_per_week"]),
+        "natal_chart": (None, limits["natal_chart"]),
+        "numerology": (None, limits["numerology"]),
+        "ai_chat": (None, limits["ai_chat"]),
+    }
+
+
+# Feature rules keyed by is_premium, built once from SUBSCRIPTION_TIERS
+_FEATURE_RULES = {
+    False: _feature_rules(SUBSCRIPTION_TIERS["free"]),
+    True: _feature_rules(SUBSCRIPTION_TIERS["premium"]),
+}
+
+
+class UserProfileMixin:
+    """Derived fields shared by User and UserSnapshot"""
+    
+    @property
+    def full_name(self):
+        parts = [self.first_name, self.last_name]
+        return " ".join(filter(None, parts)) or self.username or f"User {self.telegram_id}"
+    
+    @cached_property
+    def birth_date_iso(self):
+        d = self.birth_date
+        return f"{d.year:04d}-{d.month:02d}-{d.day:02d}" if d else None
+    
+    @cached_property
+    def birth_date_display(self):
+        d = self.birth_date
+        return f"{d.day:02d}.{d.month:02d}.{d.year:04d}" if d else None
+    
+    @hybrid_property
+    def is_premium(self):
+        return (
+            self.subscription_type == "premium"
+            and self.subscription_expires_at is not None
+            and self.subscription_expires_at > datetime.utcnow()
+        )
+    
+    @is_premium.expression
+    def is_premium(cls):
+        # Same rule in SQL, served by ix_users_subscription; NULL expiry is not premium
+        return and_(
+            cls.subscription_type == "premium",
+            cls.subscription_expires_at.is_not(None),
+            cls.subscription_expires_at > datetime.utcnow()
+        )
+    
+    def can_use_feature(self, feature: str) -> bool:
+        """Check if user can use a specific feature based on subscription"""
+        rule = _FEATURE_RULES[self.is_premium].get(feature)
+        if rule is None:
+            return False
+        
+        counter, limit = rule
+        if counter is None:
+            return limit
+        return limit == -1 or getattr(self, counter) < limit
+
+
+class User(UserProfileMixin, Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_subscription", "subscription_type", "subscription_expires_at"),
+        # send_daily_horoscopes: preferred-time window of active users with a birth date
+        Index(
+            "ix_users_horoscope_minute", "preferred_horoscope_minute",
+            postgresql_where=text("is_active = true AND birth_date IS NOT NULL")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    telegram_id = Column(Integer, unique=True, index=True, nullable=False)
+    telegram_id = Column(BigInteger, unique=True, index=True, nullable=False)
     username = Column(String(255), nullable=True)
     first_name = Column(String(255), nullable=True)
     last_name = Column(String(255), nullable=True)
@@ -16,7 +97,7 @@ class User(Base):
     
     # Birth data
     birth_date = Column(DateTime, nullable=True)
-    birth_time = Column(String(10), nullable=True)  # HH:MM format
+    birth_time = Column(Time, nullable=True)
     birth_place = Column(String(255), nullable=True)
     birth_latitude = Column(Float, nullable=True)
     birth_longitude = Column(Float, nullable=True)
@@ -24,6 +105,17 @@ class User(Base):
     
     # Preferences
     preferred_horoscope_time = Column(String(10), default="08:00")  # HH:MM format
+    # Minute of the day of preferred_horoscope_time, kept by the database for
+    # integer range queries; NULL unless the time is a well-formed "HH:MM"
+    preferred_horoscope_minute = Column(
+        SmallInteger,
+        Computed(
+            "CASE WHEN preferred_horoscope_time ~ '^[0-9]{2}:[0-9]{2}$' THEN "
+            "CAST(SUBSTR(preferred_horoscope_time, 1, 2) AS SMALLINT) * 60 + "
+            "CAST(SUBSTR(preferred_horoscope_time, 4, 2) AS SMALLINT) END",
+            persisted=True
+        )
+    )
     timezone = Column(String(50), default="UTC")
     
     # Subscription info
@@ -33,7 +125,7 @@ class User(Base):
     # Usage tracking
     daily_horoscopes_used = Column(Integer, default=0)
     weekly_tarot_readings_used = Column(Integer, default=0)
-    last_reset_date = Column(DateTime, default=func.now())
+    last_reset_date = Column(DateTime, default=func.now(), index=True)
     
     # Account status
     is_active = Column(Boolean, default=True)
@@ -42,55 +134,86 @@ class User(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
-    horoscopes = relationship("Horoscope", back_populates="user")
-    tarot_readings = relationship("TarotReading", back_populates="user")
-    payments = relationship("Payment", back_populates="user")
+    # lazy="raise": collections must be loaded explicitly with selectinload(),
+    # never one query per user on attribute access
+    horoscopes = relationship("Horoscope", back_populates="user", lazy="raise")
+    tarot_readings = relationship("TarotReading", back_populates="user", lazy="raise")
+    payments = relationship("Payment", back_populates="user", lazy="raise")
     
     def __repr__(self):
         return f"<User(telegram_id={self.telegram_id}, username={self.username})>"
     
     @property
-    def full_name(self):
-        parts = [self.first_name, self.last_name]
-        return " ".join(filter(None, parts)) or self.username or f"User {self.telegram_id}"
-    
-    @property
-    def is_premium(self):
-        if self.subscription_type == "premium" and self.subscription_expires_at:
-            from datetime import datetime
-            return datetime.utcnow() < self.subscription_expires_at
-        return False
+    def birth_time_str(self):
+        t = self.birth_time
+        return f"{t.hour:02d}:{t.minute:02d}" if t else None
     
-    def can_use_feature(self, feature: str) -> bool:
-        """Check if user can use a specific feature based on subscription"""
-        from src.config import SUBSCRIPTION_TIERS
-        
-        tier = "premium" if self.is_premium else "free"
-        limits = SUBSCRIPTION_TIERS[tier]
+    @classmethod
+    def reset_usage_counters_statement(cls, now: datetime):
+        """Single UPDATE zeroing the counters whose day/week rolled over since the last reset"""
+        today = datetime.combine(now.date(), time.min)
+        week_start = today - timedelta(days=now.weekday())
+        never_reset = cls.last_reset_date.is_(None)
+        week_rolled_over = or_(never_reset, cls.last_reset_date < week_start)
         
-        if feature == "daily_horoscope":
-            return limits["daily_horoscopes"] == -1 or self.daily_horoscopes_used < limits["daily_horoscopes"]
-        elif feature == "tarot_reading":
-            return limits["tarot_readings_per_week"] == -1 or self.weekly_tarot_readings_used < limits["tarot_readings_per_week"]
-        elif feature in ["natal_chart", "numerology", "ai_chat"]:
-            return limits.get(feature, False)
-        
-        return False
+        return (
+            update(cls)
+            .where(or_(never_reset, cls.last_reset_date < today))
+            # Users with nothing to zero are only touched once a week, to move
+            # last_reset_date into the current week; the nightly UPDATE then
+            # scales with active users rather than all users
+            .where(or_(
+                cls.daily_horoscopes_used != 0,
+                cls.weekly_tarot_readings_used != 0,
+                week_rolled_over
+            ))
+            .values(
+                daily_horoscopes_used=0,
+                weekly_tarot_readings_used=case(
+                    (week_rolled_over, 0),
+                    else_=cls.weekly_tarot_readings_used
+                ),
+                last_reset_date=now
+            )
+            # Bulk statement: no loaded objects to keep in sync
+            .execution_options(synchronize_session=False)
+        )
+
+
+@dataclass(frozen=True)
+class UserSnapshot(UserProfileMixin):
+    """Read-only subset of a User row for handlers that never mutate it"""
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    language_code: Optional[str]
+    birth_date: Optional[datetime]
+    preferred_horoscope_time: Optional[str]
+    subscription_type: Optional[str]
+    subscription_expires_at: Optional[datetime]
+    daily_horoscopes_used: Optional[int]
+    weekly_tarot_readings_used: Optional[int]
     
-    def reset_usage_counters(self):
-        """Reset daily/weekly usage counters"""
-        from datetime import datetime, timedelta
-        
-        now = datetime.utcnow()
-        
-        # Reset daily counter if it's a new day
-        if self.last_reset_date.date() < now.date():
-            self.daily_horoscopes_used = 0
-        
-        # Reset weekly counter if it's a new week (Monday)
-        days_since_monday = now.weekday()
-        week_start = now - timedelta(days=days_since_monday)
-        if self.last_reset_date < week_start:
-            self.weekly_tarot_readings_used = 0
-        
-        self.last_reset_date = now
+    def to_json(self) -> str:
+        data = asdict(self)
+        for name in _SNAPSHOT_DATETIMES:
+            if data[name]:
+                data[name] = data[name].isoformat()
+        return json.dumps(data)
+    
+    @classmethod
+    def from_json(cls, raw: str) -> "UserSnapshot":
+        data = json.loads(raw)
+        for name in _SNAPSHOT_DATETIMES:
+            if data[name]:
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+
+_SNAPSHOT_DATETIMES = ("birth_date", "subscription_expires_at")
+
+
+# Columns selected for a UserSnapshot, in field order
+USER_SNAPSHOT_COLUMNS = tuple(getattr(User, f.name) for f in fields(UserSnapshot))
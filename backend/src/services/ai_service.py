@@ -1,12 +1,147 @@
 import asyncio
+import hashlib
 import json
+from datetime import date, timedelta
+from types import MappingProxyType
 from typing import Dict, List, Optional, Any
 import httpx
 from src.config import settings
+from src.database import redis_client
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Seconds a generated answer is reused for an identical request
+_CHAT_CACHE_TTL = 300
+_TAROT_CACHE_TTL = 300
+_READING_CACHE_TTL = 86400
+
+
+# Horoscope prompts name the period they are for, so cached answers are shared by
+# everyone with the same birth data in that period; TTLs cover the period plus slack
+_HOROSCOPE_CACHE_TTLS = MappingProxyType({
+    "daily": 26 * 3600,
+    "weekly": 8 * 86400,
+    "monthly": 32 * 86400
+})
+
+
+def _horoscope_period(horoscope_type: str, today: date) -> str:
+    """The day, week or month a horoscope generated today is for"""
+    if horoscope_type == "weekly":
+        return f"the week of {today - timedelta(days=today.weekday())}"
+    if horoscope_type == "monthly":
+        return f"{today:%Y-%m}"
+    return today.isoformat()
+
+
+def _horoscope_cache_ttl(user_data: Dict[str, Any], horoscope_type: str) -> int:
+    return _HOROSCOPE_CACHE_TTLS.get(horoscope_type, _HOROSCOPE_CACHE_TTLS["daily"])
+
+
+# Read-only system prompts per language. They are module constants so every request sends
+# a byte-identical prefix, which providers can serve from their prompt cache.
+_HOROSCOPE_SYSTEM_PROMPTS = MappingProxyType({
+    "en": """You are a professional astrologer creating personalized horoscopes. 
+             Use the provided birth data to create accurate, insightful, and positive horoscopes.
+             Focus on practical advice and emotional guidance. Keep the tone warm and encouraging.
+             Avoid overly dramatic predictions. Length should be 3-4 paragraphs.""",
+    "ru": """Вы профессиональный астролог, создающий персонализированные гороскопы.
+             Используйте предоставленные данные о рождении для создания точных, проницательных и позитивных гороскопов.
+             Сосредоточьтесь на практических советах и эмоциональном руководстве. Тон должен быть теплым и ободряющим.
+             Избегайте чрезмерно драматичных предсказаний. Длина должна быть 3-4 абзаца.""",
+    "es": """Eres un astrólogo profesional creando horóscopos personalizados.
+             Usa los datos de nacimiento proporcionados para crear horóscopos precisos, perspicaces y positivos.
+             Enfócate en consejos prácticos y orientación emocional. Mantén un tono cálido y alentador.
+             Evita predicciones excesivamente dramáticas. La longitud debe ser de 3-4 párrafos."""
+})
+
+_TAROT_SYSTEM_PROMPTS = MappingProxyType({
+    "en": """You are an experienced tarot reader providing insightful interpretations.
+             Focus on the symbolic meanings of the cards and their positions in the spread.
+             Provide practical guidance and emotional insights. Be encouraging but honest.
+             Connect the cards to the user's question when provided.""",
+    "ru": """Вы опытный таролог, предоставляющий проницательные интерпретации.
+             Сосредоточьтесь на символических значениях карт и их позициях в раскладе.
+             Предоставьте практическое руководство и эмоциональные озарения. Будьте ободряющими, но честными.
+             Свяжите карты с вопросом пользователя, если он предоставлен.""",
+    "es": """Eres un lector de tarot experimentado proporcionando interpretaciones perspicaces.
+             Enfócate en los significados simbólicos de las cartas y sus posiciones en la tirada.
+             Proporciona orientación práctica y percepciones emocionales. Sé alentador pero honesto.
+             Conecta las cartas con la pregunta del usuario cuando se proporcione."""
+})
+
+_NATAL_CHART_SYSTEM_PROMPTS = MappingProxyType({
+    "en": """You are a professional astrologer interpreting natal charts.
+             Analyze the planetary positions, houses, and aspects to provide deep insights
+             into personality, life path, and potential. Be comprehensive but accessible.""",
+    "ru": """Вы профессиональный астролог, интерпретирующий натальные карты.
+             Анализируйте позиции планет, дома и аспекты, чтобы предоставить глубокие озарения
+             о личности, жизненном пути и потенциале. Будьте всеобъемлющими, но доступными.""",
+    "es": """Eres un astrólogo profesional interpretando cartas natales.
+             Analiza las posiciones planetarias, casas y aspectos para proporcionar percepciones profundas
+             sobre personalidad, camino de vida y potencial. Sé comprensivo pero accesible."""
+})
+
+_NUMEROLOGY_SYSTEM_PROMPTS = MappingProxyType({
+    "en": """You are a numerology expert providing insights based on calculated numbers.
+             Explain the significance of each number and how they influence the person's life.
+             Focus on personality traits, life purpose, and guidance for personal growth.""",
+    "ru": """Вы эксперт по нумерологии, предоставляющий озарения на основе вычисленных чисел.
+             Объясните значение каждого числа и то, как они влияют на жизнь человека.
+             Сосредоточьтесь на чертах личности, жизненной цели и руководстве для личностного роста.""",
+    "es": """Eres un experto en numerología proporcionando percepciones basadas en números calculados.
+             Explica la importancia de cada número y cómo influyen en la vida de la persona.
+             Enfócate en rasgos de personalidad, propósito de vida y orientación para crecimiento personal."""
+})
+
+_CHAT_SYSTEM_PROMPTS = MappingProxyType({
+    "en": """You are a wise and compassionate astrologer assistant.
+             Answer questions about astrology, spirituality, and life guidance.
+             Use the user's birth data when relevant. Be supportive and insightful.""",
+    "ru": """Вы мудрый и сострадательный помощник астролога.
+             Отвечайте на вопросы об астрологии, духовности и жизненном руководстве.
+             Используйте данные о рождении пользователя, когда это уместно. Будьте поддерживающими и проницательными.""",
+    "es": """Eres un asistente astrólogo sabio y compasivo.
+             Responde preguntas sobre astrología, espiritualidad y orientación de vida.
+             Usa los datos de nacimiento del usuario cuando sea relevante. Sé solidario y perspicaz."""
+})
+
+
+# Localized horoscope period names
+_HOROSCOPE_TYPE_TEXT = MappingProxyType({
+    "en": MappingProxyType({"daily": "daily", "weekly": "weekly", "monthly": "monthly"}),
+    "ru": MappingProxyType({"daily": "ежедневный", "weekly": "еженедельный", "monthly": "ежемесячный"}),
+    "es": MappingProxyType({"daily": "diario", "weekly": "semanal", "monthly": "mensual"})
+})
+
+# User prompt templates, filled with str.format_map
+_HOROSCOPE_PROMPT_TEMPLATE = """Create a {kind} horoscope for {period} for a person with this birth data:
+
+Birth Date: {birth_date}
+Birth Time: {birth_time}
+Birth Place: {birth_place}
+
+
+Please provide a personalized {horoscope_type} horoscope that takes into account their astrological profile."""
+
+_TAROT_PROMPT_TEMPLATE = """Interpret this {reading_type} tarot reading:
+
+Cards drawn:
+{cards_text}{question_text}
+
+Please provide a comprehensive interpretation of these cards and their meanings in relation to each other."""
+
+_NUMEROLOGY_PROMPT_TEMPLATE = """Provide a numerology reading for:
+
+Name: {name}
+Birth Date: {birth_date}
+
+Calculated Numbers:
+{numbers_text}
+
+Please interpret these numbers and their significance in this person's life."""
+
 
 class AIService:
     def __init__(self):
@@ -21,22 +156,58 @@ class AIService:
                 "HTTP-Referer": "https://astrologer-bot.com",
                 "X-Title": "Astrologer Telegram Bot"
             },
-            timeout=60.0
+            # HTTP/2 multiplexes concurrent generations over few long-lived TLS connections;
+            # pool limits live on the transport when one is passed explicitly
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(
+                    max_connections=200,
+                    max_keepalive_connections=100,
+                    keepalive_expiry=300.0
+                )
+            ),
+            timeout=httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0),
+            trust_env=False
         )
+        # Anthropic models need an explicit cache breakpoint; OpenAI caches prefixes automatically
+        self.prompt_caching = self.model.startswith("anthropic/")
     
     async def generate_response(
         self, 
         prompt: str, 
         system_prompt: Optional[str] = None,
         max_tokens: int = 1000,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache_ttl: Optional[int] = None
     ) -> str:
-        """Generate AI response using OpenRouter API"""
+        """Generate AI response using OpenRouter API, reusing a cached answer when cache_ttl is set"""
+        cache_key = None
+        if cache_ttl:
+            cache_key = "ai:" + hashlib.blake2b(
+                f"{self.model}|{temperature}|{max_tokens}|{system_prompt}|{prompt}".encode(),
+                digest_size=16
+            ).hexdigest()
+            try:
+                cached = await redis_client.get(cache_key)
+                if cached is not None:
+                    return cached
+            except Exception as e:
+                logger.warning(f"AI cache lookup failed: {e}")
+        
         try:
             messages = []
             
             if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
+                if self.prompt_caching:
+                    content = [{
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"}
+                    }]
+                else:
+                    content = system_prompt
+                messages.append({"role": "system", "content": content})
             
             messages.append({"role": "user", "content": prompt})
             
@@ -52,11 +223,28 @@ class AIService:
             response.raise_for_status()
             
             data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
-            
-        except Exception as e:
-            logger.error(f"AI generation error: {e}")
-            raise Exception(f"Failed to generate AI response: {str(e)}")
+            text = data["choices"][0]["message"]["content"].strip()
+        except Exception:
+            logger.exception("AI generation error")
+            raise
+        
+        if cache_key:
+            try:
+                await redis_client.set(cache_key, text, ex=cache_ttl)
+            except Exception as e:
+                logger.warning(f"AI cache store failed: {e}")
+        return text
+    
+    async def generate(self, kind: str, *args, language: str = "en") -> str:
+        """Generate text for one of the _AI_SPECS kinds; args go to its prompt builder"""
+        system_prompts, build_prompt, max_tokens, temperature, cache_ttl = _AI_SPECS[kind]
+        return await self.generate_response(
+            prompt=build_prompt(self, *args, language),
+            system_prompt=system_prompts.get(language) or system_prompts["en"],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            cache_ttl=cache_ttl(*args) if callable(cache_ttl) else cache_ttl
+        )
     
     async def generate_horoscope(
         self, 
@@ -65,19 +253,7 @@ class AIService:
         language: str = "en"
     ) -> str:
         """Generate personalized horoscope"""
-        
-        # System prompt for horoscope generation
-        system_prompt = self._get_horoscope_system_prompt(language)
-        
-        # User prompt with birth data
-        user_prompt = self._build_horoscope_prompt(user_data, horoscope_type, language)
-        
-        return await self.generate_response(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            max_tokens=800,
-            temperature=0.8
-        )
+        return await self.generate("horoscope", user_data, horoscope_type, language=language)
     
     async def generate_tarot_interpretation(
         self,
@@ -87,16 +263,7 @@ class AIService:
         language: str = "en"
     ) -> str:
         """Generate tarot reading interpretation"""
-        
-        system_prompt = self._get_tarot_system_prompt(language)
-        user_prompt = self._build_tarot_prompt(cards, reading_type, question, language)
-        
-        return await self.generate_response(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            max_tokens=1200,
-            temperature=0.9
-        )
+        return await self.generate("tarot", cards, reading_type, question, language=language)
     
     async def generate_natal_chart_interpretation(
         self,
@@ -104,16 +271,7 @@ class AIService:
         language: str = "en"
     ) -> str:
         """Generate natal chart interpretation"""
-        
-        system_prompt = self._get_natal_chart_system_prompt(language)
-        user_prompt = self._build_natal_chart_prompt(chart_data, language)
-        
-        return await self.generate_response(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            max_tokens=1500,
-            temperature=0.7
-        )
+        return await self.generate("natal_chart", chart_data, language=language)
     
     async def generate_numerology_reading(
         self,
@@ -123,16 +281,7 @@ class AIService:
         language: str = "en"
     ) -> str:
         """Generate numerology reading"""
-        
-        system_prompt = self._get_numerology_system_prompt(language)
-        user_prompt = self._build_numerology_prompt(numbers, birth_date, name, language)
-        
-        return await self.generate_response(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            max_tokens=1000,
-            temperature=0.8
-        )
+        return await self.generate("numerology", numbers, birth_date, name, language=language)
     
     async def chat_response(
         self,
@@ -141,125 +290,30 @@ class AIService:
         language: str = "en"
     ) -> str:
         """Generate conversational response"""
-        
-        system_prompt = self._get_chat_system_prompt(language)
-        user_prompt = self._build_chat_prompt(user_message, user_context, language)
-        
-        return await self.generate_response(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            max_tokens=600,
-            temperature=0.8
-        )
-    
-    def _get_horoscope_system_prompt(self, language: str) -> str:
-        prompts = {
-            "en": """You are a professional astrologer creating personalized horoscopes. 
-                     Use the provided birth data to create accurate, insightful, and positive horoscopes.
-                     Focus on practical advice and emotional guidance. Keep the tone warm and encouraging.
-                     Avoid overly dramatic predictions. Length should be 3-4 paragraphs.""",
-            "ru": """Вы профессиональный астролог, создающий персонализированные гороскопы.
-                     Используйте предоставленные данные о рождении для создания точных, проницательных и позитивных гороскопов.
-                     Сосредоточьтесь на практических советах и эмоциональном руководстве. Тон должен быть теплым и ободряющим.
-                     Избегайте чрезмерно драматичных предсказаний. Длина должна быть 3-4 абзаца.""",
-            "es": """Eres un astrólogo profesional creando horóscopos personalizados.
-                     Usa los datos de nacimiento proporcionados para crear horóscopos precisos, perspicaces y positivos.
-                     Enfócate en consejos prácticos y orientación emocional. Mantén un tono cálido y alentador.
-                     Evita predicciones excesivamente dramáticas. La longitud debe ser de 3-4 párrafos."""
-        }
-        return prompts.get(language, prompts["en"])
-    
-    def _get_tarot_system_prompt(self, language: str) -> str:
-        prompts = {
-            "en": """You are an experienced tarot reader providing insightful interpretations.
-                     Focus on the symbolic meanings of the cards and their positions in the spread.
-                     Provide practical guidance and emotional insights. Be encouraging but honest.
-                     Connect the cards to the user's question when provided.""",
-            "ru": """Вы опытный таролог, предоставляющий проницательные интерпретации.
-                     Сосредоточьтесь на символических значениях карт и их позициях в раскладе.
-                     Предоставьте практическое руководство и эмоциональные озарения. Будьте ободряющими, но честными.
-                     Свяжите карты с вопросом пользователя, если он предоставлен.""",
-            "es": """Eres un lector de tarot experimentado proporcionando interpretaciones perspicaces.
-                     Enfócate en los significados simbólicos de las cartas y sus posiciones en la tirada.
-                     Proporciona orientación práctica y percepciones emocionales. Sé alentador pero honesto.
-                     Conecta las cartas con la pregunta del usuario cuando se proporcione."""
-        }
-        return prompts.get(language, prompts["en"])
-    
-    def _get_natal_chart_system_prompt(self, language: str) -> str:
-        prompts = {
-            "en": """You are a professional astrologer interpreting natal charts.
-                     Analyze the planetary positions, houses, and aspects to provide deep insights
-                     into personality, life path, and potential. Be comprehensive but accessible.""",
-            "ru": """Вы профессиональный астролог, интерпретирующий натальные карты.
-                     Анализируйте позиции планет, дома и аспекты, чтобы предоставить глубокие озарения
-                     о личности, жизненном пути и потенциале. Будьте всеобъемлющими, но доступными.""",
-            "es": """Eres un astrólogo profesional interpretando cartas natales.
-                     Analiza las posiciones planetarias, casas y aspectos para proporcionar percepciones profundas
-                     sobre personalidad, camino de vida y potencial. Sé comprensivo pero accesible."""
-        }
-        return prompts.get(language, prompts["en"])
-    
-    def _get_numerology_system_prompt(self, language: str) -> str:
-        prompts = {
-            "en": """You are a numerology expert providing insights based on calculated numbers.
-                     Explain the significance of each number and how they influence the person's life.
-                     Focus on personality traits, life purpose, and guidance for personal growth.""",
-            "ru": """Вы эксперт по нумерологии, предоставляющий озарения на основе вычисленных чисел.
-                     Объясните значение каждого числа и то, как они влияют на жизнь человека.
-                     Сосредоточьтесь на чертах личности, жизненной цели и руководстве для личностного роста.""",
-            "es": """Eres un experto en numerología proporcionando percepciones basadas en números calculados.
-                     Explica la importancia de cada número y cómo influyen en la vida de la persona.
-                     Enfócate en rasgos de personalidad, propósito de vida y orientación para crecimiento personal."""
-        }
-        return prompts.get(language, prompts["en"])
-    
-    def _get_chat_system_prompt(self, language: str) -> str:
-        prompts = {
-            "en": """You are a wise and compassionate astrologer assistant.
-                     Answer questions about astrology, spirituality, and life guidance.
-                     Use the user's birth data when relevant. Be supportive and insightful.""",
-            "ru": """Вы мудрый и сострадательный помощник астролога.
-                     Отвечайте на вопросы об астрологии, духовности и жизненном руководстве.
-                     Используйте данные о рождении пользователя, когда это уместно. Будьте поддерживающими и проницательными.""",
-            "es": """Eres un asistente astrólogo sabio y compasivo.
-                     Responde preguntas sobre astrología, espiritualidad y orientación de vida.
-                     Usa los datos de nacimiento del usuario cuando sea relevante. Sé solidario y perspicaz."""
-        }
-        return prompts.get(language, prompts["en"])
+        return await self.generate("chat", user_message, user_context, language=language)
     
     def _build_horoscope_prompt(self, user_data: Dict[str, Any], horoscope_type: str, language: str) -> str:
         """Build prompt for horoscope generation"""
-        birth_info = f"""
-Birth Date: {user_data.get('birth_date', 'Unknown')}
-Birth Time: {user_data.get('birth_time', 'Unknown')}
-Birth Place: {user_data.get('birth_place', 'Unknown')}
-"""
-        
-        type_text = {
-            "en": {"daily": "daily", "weekly": "weekly", "monthly": "monthly"},
-            "ru": {"daily": "ежедневный", "weekly": "еженедельный", "monthly": "ежемесячный"},
-            "es": {"daily": "diario", "weekly": "semanal", "monthly": "mensual"}
-        }
-        
-        return f"""Create a {type_text[language][horoscope_type]} horoscope for a person with this birth data:
-{birth_info}
-
-Please provide a personalized {horoscope_type} horoscope that takes into account their astrological profile."""
+        type_text = _HOROSCOPE_TYPE_TEXT.get(language) or _HOROSCOPE_TYPE_TEXT["en"]
+        return _HOROSCOPE_PROMPT_TEMPLATE.format_map({
+            "kind": type_text[horoscope_type],
+            "period": _horoscope_period(horoscope_type, date.today()),
+            "horoscope_type": horoscope_type,
+            "birth_date": user_data.get('birth_date', 'Unknown'),
+            "birth_time": user_data.get('birth_time', 'Unknown'),
+            "birth_place": user_data.get('birth_place', 'Unknown')
+        })
     
     def _build_tarot_prompt(self, cards: List[Dict[str, Any]], reading_type: str, question: Optional[str], language: str) -> str:
         """Build prompt for tarot interpretation"""
-        cards_text = "\n".join([f"{i+1}. {card['name']} - Position: {card.get('position', 'N/A')}" 
-                               for i, card in enumerate(cards)])
-        
-        question_text = f"\nUser's Question: {question}" if question else ""
-        
-        return f"""Interpret this {reading_type} tarot reading:
-
-Cards drawn:
-{cards_text}{question_text}
-
-Please provide a comprehensive interpretation of these cards and their meanings in relation to each other."""
+        return _TAROT_PROMPT_TEMPLATE.format_map({
+            "reading_type": reading_type,
+            "cards_text": "\n".join(
+                f"{i+1}. {card['name']} - Position: {card.get('position', 'N/A')}"
+                for i, card in enumerate(cards)
+            ),
+            "question_text": f"\nUser's Question: {question}" if question else ""
+        })
     
     def _build_natal_chart_prompt(self, chart_data: Dict[str, Any], language: str) -> str:
         """Build prompt for natal chart interpretation"""
@@ -271,17 +325,11 @@ Please provide a comprehensive interpretation covering personality, life path, s
     
     def _build_numerology_prompt(self, numbers: Dict[str, int], birth_date: str, name: str, language: str) -> str:
         """Build prompt for numerology reading"""
-        numbers_text = "\n".join([f"{key}: {value}" for key, value in numbers.items()])
-        
-        return f"""Provide a numerology reading for:
-
-Name: {name}
-Birth Date: {birth_date}
-
-Calculated Numbers:
-{numbers_text}
-
-Please interpret these numbers and their significance in this person's life."""
+        return _NUMEROLOGY_PROMPT_TEMPLATE.format_map({
+            "name": name,
+            "birth_date": birth_date,
+            "numbers_text": "\n".join(f"{key}: {value}" for key, value in numbers.items())
+        })
     
     def _build_chat_prompt(self, user_message: str, user_context: Dict[str, Any], language: str) -> str:
         """Build prompt for chat response"""
@@ -303,5 +351,32 @@ Please provide a helpful and insightful response as an astrologer."""
         await self.client.aclose()
 
 
-# Global AI service instance
-ai_service = AIService()
+# kind -> (system prompts, user prompt builder, max_tokens, temperature, cache TTL or a
+# TTL factory called with the prompt builder's arguments)
+_AI_SPECS = MappingProxyType({
+    "horoscope": (_HOROSCOPE_SYSTEM_PROMPTS, AIService._build_horoscope_prompt, 800, 0.8, _horoscope_cache_ttl),
+    "tarot": (_TAROT_SYSTEM_PROMPTS, AIService._build_tarot_prompt, 1200, 0.9, _TAROT_CACHE_TTL),
+    "natal_chart": (_NATAL_CHART_SYSTEM_PROMPTS, AIService._build_natal_chart_prompt, 1500, 0.7, _READING_CACHE_TTL),
+    "numerology": (_NUMEROLOGY_SYSTEM_PROMPTS, AIService._build_numerology_prompt, 1000, 0.8, _READING_CACHE_TTL),
+    "chat": (_CHAT_SYSTEM_PROMPTS, AIService._build_chat_prompt, 600, 0.8, _CHAT_CACHE_TTL),
+})
+
+
+# Shared AI service, created lazily inside the running event loop
+_ai_service: Optional[AIService] = None
+
+
+def get_ai_service() -> AIService:
+    """Return the process-wide AIService, creating it on first use"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
+
+
+async def close_ai_service():
+    """Close the shared AIService; the next get_ai_service() call creates a new one"""
+    global _ai_service
+    if _ai_service is not None:
+        service, _ai_service = _ai_service, None
+        await service.close()
@@ -1,19 +1,125 @@
 import swisseph as swe
+import asyncio
+import os
+import sqlite3
+import threading
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, List, Tuple, Any, Optional
 import math
+import numpy as np
 from geopy.geocoders import Nominatim
 from timezonefinder import TimezoneFinder
 import pytz
 import logging
+from src.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _open_geocode_cache(path: str) -> Optional[sqlite3.Connection]:
+    """Open the on-disk geocoding cache; geocoding still works without it"""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode "
+            "(query TEXT PRIMARY KEY, latitude REAL NOT NULL, longitude REAL NOT NULL)"
+        )
+        conn.commit()
+        return conn
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Geocode cache unavailable at {path}: {e}")
+        return None
+
+
+# Nominatim usage policy: no more than one request per second
+_GEOCODE_INTERVAL = 1.0
+
+_MINUTES_PER_DAY = 1440
+
+# Natal aspects in match priority order, with their orbs
+_NATAL_ASPECT_NAMES = ("Conjunction", "Opposition", "Trine", "Square", "Sextile")
+_NATAL_ASPECT_ANGLES = np.array([0, 180, 120, 90, 60], dtype=np.float64)
+_NATAL_ASPECT_ORBS = np.array([8, 8, 8, 8, 6], dtype=np.float64)
+_NATAL_ASPECT_EXACT = tuple(int(angle) for angle in _NATAL_ASPECT_ANGLES)
+
+# Aspects counted as exact on a given day (within 1 degree)
+_DAILY_ASPECT_NAMES = ("Conjunction", "Sextile", "Square", "Trine", "Opposition")
+_DAILY_ASPECT_ANGLES = np.array([0, 60, 90, 120, 180], dtype=np.float64)
+_DAILY_ASPECT_ORBS = np.ones(5, dtype=np.float64)
+
+# Transit-to-natal aspects in match priority order, all within 2 degrees
+_TRANSIT_ASPECT_NAMES = ("Conjunction", "Opposition", "Square", "Trine")
+_TRANSIT_ASPECT_ANGLES = np.array([0, 180, 90, 120], dtype=np.float64)
+_TRANSIT_ASPECT_ORBS = np.full(4, 2, dtype=np.float64)
+
+
+def _find_aspects(lons: np.ndarray, angles: np.ndarray, orbs: np.ndarray):
+    """Aspects between every pair of longitudes, pairs in (i, j) order with i < j.
+    
+    Returns parallel lists (i, j, aspect index, separation, orb) for the pairs
+    that form one of `angles` within its orb; the first matching angle wins.
+    """
+    first, second = np.triu_indices(len(lons), k=1)
+    separation = np.abs(lons[first] - lons[second])
+    separation = np.minimum(separation, 360 - separation)
+    
+    delta = np.abs(separation[:, None] - angles)
+    within = delta <= orbs
+    pairs = np.flatnonzero(within.any(axis=1))
+    aspect = within[pairs].argmax(axis=1)
+    return (
+        first[pairs].tolist(),
+        second[pairs].tolist(),
+        aspect.tolist(),
+        separation[pairs].tolist(),
+        delta[pairs, aspect].tolist()
+    )
+
+
+def _find_cross_aspects(
+    lons: np.ndarray, other_lons: np.ndarray, angles: np.ndarray, orbs: np.ndarray
+):
+    """Aspects between every longitude in lons and every one in other_lons.
+    
+    Returns parallel lists (i, j, aspect index, orb) in row-major (i, j) order,
+    with the same first-matching-angle rule as _find_aspects.
+    """
+    separation = np.abs(lons[:, None] - other_lons[None, :])
+    separation = np.minimum(separation, 360 - separation)
+    
+    delta = np.abs(separation[..., None] - angles)
+    within = delta <= orbs
+    first, second = np.nonzero(within.any(axis=2))
+    aspect = within[first, second].argmax(axis=1)
+    return (
+        first.tolist(),
+        second.tolist(),
+        aspect.tolist(),
+        delta[first, second, aspect].tolist()
+    )
+
+
 class AstrologyService:
     def __init__(self):
+        # Point Swiss Ephemeris at its data files once and open them up front,
+        # instead of on the first chart request
+        swe.set_ephe_path(settings.swe_ephe_path)
+        swe.calc_ut(swe.julday(2000, 1, 1, 0), swe.SUN)
+        
         self.geolocator = Nominatim(user_agent="astrologer-bot")
+        # Nominatim's usage policy asks clients to cache repeated lookups
+        self.geocode_cache = _open_geocode_cache(settings.geocode_cache_path)
+        # ...and at most one request per second; callers queue up without blocking the loop
+        self._geocode_lock = asyncio.Lock()
+        self._last_geocode = 0.0
         self.tf = TimezoneFinder()
+        # Timezones per 0.01° (~1 km) grid cell, shared by every user inside it
+        self._timezone_at_cell = lru_cache(maxsize=10000)(self._lookup_timezone)
         
         # Planet constants
         self.PLANETS = {
@@ -29,11 +135,23 @@ class AstrologyService:
             swe.PLUTO: "Pluto"
         }
         
+        # Planet ids in PLANETS order, for the positions helper
+        self._planet_ids = tuple(self.PLANETS)
+        self._planet_names = tuple(self.PLANETS.values())
+        
+        # Positions per time bucket and whole natal charts repeat across requests
+        self._longitudes_at_bucket = lru_cache(maxsize=4096)(self._compute_longitudes)
+        self._natal_chart_cached = lru_cache(maxsize=4096)(self._calculate_natal_chart)
+        # Swiss Ephemeris keeps global state; worker threads take turns with it
+        self._swe_lock = threading.Lock()
+        
         # Zodiac signs
         self.SIGNS = [
             "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
             "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
         ]
+        # "° Sign" tails of formatted positions, so only the degree is formatted per call
+        self._sign_suffixes = tuple(f"° {sign}" for sign in self.SIGNS)
         
         # Houses
         self.HOUSES = [
@@ -43,18 +161,44 @@ class AstrologyService:
     
     async def get_coordinates(self, location: str) -> Tuple[float, float]:
         """Get latitude and longitude for a location"""
+        query = location.strip().lower()
+        if self.geocode_cache is not None:
+            row = self.geocode_cache.execute(
+                "SELECT latitude, longitude FROM geocode WHERE query = ?", (query,)
+            ).fetchone()
+            if row:
+                return row[0], row[1]
+        
         try:
-            location_data = self.geolocator.geocode(location)
-            if location_data:
-                return location_data.latitude, location_data.longitude
-            else:
+            async with self._geocode_lock:
+                wait = _GEOCODE_INTERVAL - (time.monotonic() - self._last_geocode)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    # geopy's HTTP call blocks; keep it off the event loop
+                    location_data = await asyncio.to_thread(self.geolocator.geocode, query)
+                finally:
+                    self._last_geocode = time.monotonic()
+            if not location_data:
                 raise ValueError(f"Location not found: {location}")
+            
+            coordinates = (location_data.latitude, location_data.longitude)
+            if self.geocode_cache is not None:
+                self.geocode_cache.execute(
+                    "INSERT OR REPLACE INTO geocode (query, latitude, longitude) VALUES (?, ?, ?)",
+                    (query, *coordinates)
+                )
+                self.geocode_cache.commit()
+            return coordinates
         except Exception as e:
             logger.error(f"Geocoding error: {e}")
             raise
     
     def get_timezone(self, latitude: float, longitude: float) -> str:
         """Get timezone for coordinates"""
+        return self._timezone_at_cell(round(latitude, 2), round(longitude, 2))
+    
+    def _lookup_timezone(self, latitude: float, longitude: float) -> str:
         try:
             tz_name = self.tf.timezone_at(lat=latitude, lng=longitude)
             return tz_name or "UTC"
@@ -82,36 +226,79 @@ class AstrologyService:
             logger.error(f"Julian day calculation error: {e}")
             raise
     
+    def _longitudes(self, jd: float, bucket_minutes: int = 1) -> np.ndarray:
+        """Ecliptic longitudes of all PLANETS at jd (to bucket_minutes), in PLANETS order"""
+        bucket = round(jd * _MINUTES_PER_DAY / bucket_minutes)
+        return np.array(self._longitudes_at_bucket(bucket, bucket_minutes))
+    
+    def _compute_longitudes(self, bucket: int, bucket_minutes: int) -> Tuple[float, ...]:
+        jd = bucket * bucket_minutes / _MINUTES_PER_DAY
+        return tuple(swe.calc_ut(jd, planet_id)[0][0] for planet_id in self._planet_ids)
+    
+    def _planet_positions(self, lons: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        """Sign/degree breakdown for the longitudes returned by _longitudes"""
+        signs = self.SIGNS
+        suffixes = self._sign_suffixes
+        sign_indexes = (lons // 30).astype(np.int64).tolist()
+        degrees = (lons % 30).tolist()
+        return {
+            name: {
+                "longitude": lon,
+                "sign": signs[sign_index],
+                "degree": degree,
+                "formatted": f"{degree:.1f}{suffixes[sign_index]}"
+            }
+            for name, lon, sign_index, degree in zip(
+                self._planet_names, lons.tolist(), sign_indexes, degrees
+            )
+        }
+    
     def calculate_natal_chart(
         self, 
         birth_date: datetime, 
         latitude: float, 
         longitude: float
     ) -> Dict[str, Any]:
-        """Calculate complete natal chart"""
+        """Calculate complete natal chart (shared between callers; treat as read-only)"""
+        # Coordinates to 4 decimals (~11 m) so the same birthplace always hits the cache
+        return self._natal_chart_cached(birth_date, round(latitude, 4), round(longitude, 4))
+    
+    async def calculate_natal_chart_async(
+        self, 
+        birth_date: datetime, 
+        latitude: float, 
+        longitude: float
+    ) -> Dict[str, Any]:
+        """calculate_natal_chart in a worker thread, keeping the event loop free"""
+        return await self._run_in_thread(self.calculate_natal_chart, birth_date, latitude, longitude)
+    
+    async def get_current_transits_async(self, natal_planets: Dict[str, Dict]) -> Dict[str, Any]:
+        """get_current_transits in a worker thread"""
+        return await self._run_in_thread(self.get_current_transits, natal_planets)
+    
+    async def get_daily_aspects_async(self, date: datetime) -> List[Dict[str, Any]]:
+        """get_daily_aspects in a worker thread"""
+        return await self._run_in_thread(self.get_daily_aspects, date)
+    
+    async def _run_in_thread(self, func, *args):
+        # Swiss Ephemeris is not thread-safe: calls are serialized on _swe_lock,
+        # so this only frees the event loop and does not add parallelism
+        def locked():
+            with self._swe_lock:
+                return func(*args)
+        return await asyncio.to_thread(locked)
+    
+    def _calculate_natal_chart(
+        self, 
+        birth_date: datetime, 
+        latitude: float, 
+        longitude: float
+    ) -> Dict[str, Any]:
         try:
             jd = self.calculate_julian_day(birth_date, latitude, longitude)
             
             # Calculate planetary positions
-            planets = {}
-            for planet_id, planet_name in self.PLANETS.items():
-                try:
-                    pos, _ = swe.calc_ut(jd, planet_id)
-                    longitude_deg = pos[0]
-                    
-                    # Calculate sign and degree
-                    sign_index = int(longitude_deg // 30)
-                    degree_in_sign = longitude_deg % 30
-                    
-                    planets[planet_name] = {
-                        "longitude": longitude_deg,
-                        "sign": self.SIGNS[sign_index],
-                        "degree": degree_in_sign,
-                        "formatted": f"{degree_in_sign:.1f}° {self.SIGNS[sign_index]}"
-                    }
-                except Exception as e:
-                    logger.error(f"Error calculating {planet_name}: {e}")
-                    continue
+            planets = self._planet_positions(self._longitudes(jd))
             
             # Calculate houses using Placidus system
             houses = self.calculate_houses(jd, latitude, longitude)
@@ -135,6 +322,16 @@ class AstrologyService:
             logger.error(f"Natal chart calculation error: {e}")
             raise
     
+    def _cusp_position(self, cusp: float) -> Dict[str, Any]:
+        sign_index = int(cusp // 30)
+        degree_in_sign = cusp % 30
+        return {
+            "cusp": cusp,
+            "sign": self.SIGNS[sign_index],
+            "degree": degree_in_sign,
+            "formatted": f"{degree_in_sign:.1f}{self._sign_suffixes[sign_index]}"
+        }
+    
     def calculate_houses(self, jd: float, latitude: float, longitude: float) -> Dict[str, Any]:
         """Calculate house cusps using Placidus system"""
         try:
@@ -144,30 +341,11 @@ class AstrologyService:
             houses = {}
             for i, cusp in enumerate(cusps):
                 if i < 12:  # Only 12 houses
-                    sign_index = int(cusp // 30)
-                    degree_in_sign = cusp % 30
-                    
-                    houses[self.HOUSES[i]] = {
-                        "cusp": cusp,
-                        "sign": self.SIGNS[sign_index],
-                        "degree": degree_in_sign,
-                        "formatted": f"{degree_in_sign:.1f}° {self.SIGNS[sign_index]}"
-                    }
+                    houses[self.HOUSES[i]] = self._cusp_position(cusp)
             
             # Add important points
-            houses["Ascendant"] = {
-                "cusp": ascmc[0],
-                "sign": self.SIGNS[int(ascmc[0] // 30)],
-                "degree": ascmc[0] % 30,
-                "formatted": f"{ascmc[0] % 30:.1f}° {self.SIGNS[int(ascmc[0] // 30)]}"
-            }
-            
-            houses["Midheaven"] = {
-                "cusp": ascmc[1],
-                "sign": self.SIGNS[int(ascmc[1] // 30)],
-                "degree": ascmc[1] % 30,
-                "formatted": f"{ascmc[1] % 30:.1f}° {self.SIGNS[int(ascmc[1] // 30)]}"
-            }
+            houses["Ascendant"] = self._cusp_position(ascmc[0])
+            houses["Midheaven"] = self._cusp_position(ascmc[1])
             
             return houses
             
@@ -177,46 +355,25 @@ class AstrologyService:
     
     def calculate_aspects(self, planets: Dict[str, Dict]) -> List[Dict[str, Any]]:
         """Calculate major aspects between planets"""
-        aspects = []
-        aspect_orbs = {
-            "Conjunction": (0, 8),
-            "Opposition": (180, 8),
-            "Trine": (120, 8),
-            "Square": (90, 8),
-            "Sextile": (60, 6)
-        }
+        planet_names = list(planets)
+        lons = np.fromiter(
+            (planets[name]["longitude"] for name in planet_names),
+            dtype=np.float64, count=len(planet_names)
+        )
         
-        planet_names = list(planets.keys())
-        
-        for i, planet1 in enumerate(planet_names):
-            for planet2 in planet_names[i+1:]:
-                try:
-                    lon1 = planets[planet1]["longitude"]
-                    lon2 = planets[planet2]["longitude"]
-                    
-                    # Calculate angular difference
-                    diff = abs(lon1 - lon2)
-                    if diff > 180:
-                        diff = 360 - diff
-                    
-                    # Check for aspects
-                    for aspect_name, (aspect_angle, orb) in aspect_orbs.items():
-                        if abs(diff - aspect_angle) <= orb:
-                            aspects.append({
-                                "planet1": planet1,
-                                "planet2": planet2,
-                                "aspect": aspect_name,
-                                "angle": diff,
-                                "orb": abs(diff - aspect_angle),
-                                "exact_angle": aspect_angle
-                            })
-                            break
-                            
-                except Exception as e:
-                    logger.error(f"Aspect calculation error for {planet1}-{planet2}: {e}")
-                    continue
-        
-        return aspects
+        return [
+            {
+                "planet1": planet_names[i],
+                "planet2": planet_names[j],
+                "aspect": _NATAL_ASPECT_NAMES[aspect],
+                "angle": separation,
+                "orb": orb,
+                "exact_angle": _NATAL_ASPECT_EXACT[aspect]
+            }
+            for i, j, aspect, separation, orb in zip(
+                *_find_aspects(lons, _NATAL_ASPECT_ANGLES, _NATAL_ASPECT_ORBS)
+            )
+        ]
     
     def get_current_transits(self, natal_planets: Dict[str, Dict]) -> Dict[str, Any]:
         """Get current planetary transits"""
@@ -224,70 +381,28 @@ class AstrologyService:
             now = datetime.now(timezone.utc)
             jd = self.calculate_julian_day(now, 0, 0)  # Use UTC coordinates
             
-            current_planets = {}
-            for planet_id, planet_name in self.PLANETS.items():
-                try:
-                    pos, _ = swe.calc_ut(jd, planet_id)
-                    longitude_deg = pos[0]
-                    
-                    sign_index = int(longitude_deg // 30)
-                    degree_in_sign = longitude_deg % 30
-                    
-                    current_planets[planet_name] = {
-                        "longitude": longitude_deg,
-                        "sign": self.SIGNS[sign_index],
-                        "degree": degree_in_sign,
-                        "formatted": f"{degree_in_sign:.1f}° {self.SIGNS[sign_index]}"
-                    }
-                except Exception as e:
-                    logger.error(f"Transit calculation error for {planet_name}: {e}")
-                    continue
+            # Transit positions barely move within ten minutes
+            transit_lons = self._longitudes(jd, bucket_minutes=10)
+            current_planets = self._planet_positions(transit_lons)
             
-            # Calculate transits to natal planets
-            transits = []
-            for transit_planet, transit_data in current_planets.items():
-                for natal_planet, natal_data in natal_planets.items():
-                    try:
-                        transit_lon = transit_data["longitude"]
-                        natal_lon = natal_data["longitude"]
-                        
-                        diff = abs(transit_lon - natal_lon)
-                        if diff > 180:
-                            diff = 360 - diff
-                        
-                        # Check for major transiting aspects
-                        if diff <= 2:  # Conjunction
-                            transits.append({
-                                "transit_planet": transit_planet,
-                                "natal_planet": natal_planet,
-                                "aspect": "Conjunction",
-                                "orb": diff
-                            })
-                        elif abs(diff - 180) <= 2:  # Opposition
-                            transits.append({
-                                "transit_planet": transit_planet,
-                                "natal_planet": natal_planet,
-                                "aspect": "Opposition",
-                                "orb": abs(diff - 180)
-                            })
-                        elif abs(diff - 90) <= 2:  # Square
-                            transits.append({
-                                "transit_planet": transit_planet,
-                                "natal_planet": natal_planet,
-                                "aspect": "Square",
-                                "orb": abs(diff - 90)
-                            })
-                        elif abs(diff - 120) <= 2:  # Trine
-                            transits.append({
-                                "transit_planet": transit_planet,
-                                "natal_planet": natal_planet,
-                                "aspect": "Trine",
-                                "orb": abs(diff - 120)
-                            })
-                            
-                    except Exception as e:
-                        logger.error(f"Transit aspect calculation error: {e}")
-                        continue
+            # Calculate transits to natal planets across the whole pair grid at once
+            natal_names = list(natal_planets)
+            natal_lons = np.array(
+                [data["longitude"] for data in natal_planets.values()], dtype=np.float64
+            )
+            transits = [
+                {
+                    "transit_planet": self._planet_names[i],
+                    "natal_planet": natal_names[j],
+                    "aspect": _TRANSIT_ASPECT_NAMES[aspect],
+                    "orb": orb
+                }
+                for i, j, aspect, orb in zip(
+                    *_find_cross_aspects(
+                        transit_lons, natal_lons, _TRANSIT_ASPECT_ANGLES, _TRANSIT_ASPECT_ORBS
+                    )
+                )
+            ]
             
             return {
                 "current_planets": current_planets,
@@ -305,46 +420,20 @@ class AstrologyService:
             jd = self.calculate_julian_day(date, 0, 0)
             
             # Calculate planetary positions for the day
-            planets = {}
-            for planet_id, planet_name in self.PLANETS.items():
-                try:
-                    pos, _ = swe.calc_ut(jd, planet_id)
-                    planets[planet_name] = pos[0]
-                except Exception as e:
-                    logger.error(f"Daily aspect calculation error for {planet_name}: {e}")
-                    continue
+            lons = self._longitudes(jd)
             
             # Find aspects forming on this day
-            aspects = []
-            planet_names = list(planets.keys())
-            
-            for i, planet1 in enumerate(planet_names):
-                for planet2 in planet_names[i+1:]:
-                    try:
-                        lon1 = planets[planet1]
-                        lon2 = planets[planet2]
-                        
-                        diff = abs(lon1 - lon2)
-                        if diff > 180:
-                            diff = 360 - diff
-                        
-                        # Check for exact aspects (within 1 degree)
-                        major_aspects = [0, 60, 90, 120, 180]
-                        for aspect_angle in major_aspects:
-                            if abs(diff - aspect_angle) <= 1:
-                                aspect_names = {0: "Conjunction", 60: "Sextile", 90: "Square", 
-                                              120: "Trine", 180: "Opposition"}
-                                aspects.append({
-                                    "planet1": planet1,
-                                    "planet2": planet2,
-                                    "aspect": aspect_names[aspect_angle],
-                                    "orb": abs(diff - aspect_angle)
-                                })
-                                break
-                                
-                    except Exception as e:
-                        logger.error(f"Daily aspect error for {planet1}-{planet2}: {e}")
-                        continue
+            aspects = [
+                {
+                    "planet1": self._planet_names[i],
+                    "planet2": self._planet_names[j],
+                    "aspect": _DAILY_ASPECT_NAMES[aspect],
+                    "orb": orb
+                }
+                for i, j, aspect, _, orb in zip(
+                    *_find_aspects(lons, _DAILY_ASPECT_ANGLES, _DAILY_ASPECT_ORBS)
+                )
+            ]
             
             return aspects
             
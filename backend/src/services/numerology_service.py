@@ -1,11 +1,98 @@
 from datetime import datetime
-from typing import Dict, Any
-import re
+from typing import Dict, Any, Tuple
 import logging
+from types import MappingProxyType
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+# Meanings per number type, built once at import
+_MEANINGS = MappingProxyType({
+    "life_path": {
+        1: "The Leader - Independent, pioneering, ambitious, and strong-willed. Natural born leaders who are innovative and original.",
+        2: "The Peacemaker - Cooperative, diplomatic, sensitive, and patient. Excellent mediators who work well with others.",
+        3: "The Creative - Artistic, expressive, optimistic, and inspiring. Natural entertainers with great communication skills.",
+        4: "The Builder - Practical, hardworking, reliable, and organized. Excellent at creating solid foundations and systems.",
+        5: "The Freedom Seeker - Adventurous, versatile, curious, and progressive. Love variety and freedom in all aspects of life.",
+        6: "The Nurturer - Caring, responsible, protective, and healing. Natural caregivers who put family and community first.",
+        7: "The Seeker - Analytical, introspective, spiritual, and mysterious. Deep thinkers who seek truth and understanding.",
+        8: "The Achiever - Ambitious, material-focused, powerful, and business-minded. Natural ability to achieve material success.",
+        9: "The Humanitarian - Compassionate, generous, idealistic, and romantic. Dedicated to serving humanity and making the world better.",
+        11: "The Intuitive - Highly intuitive, spiritual, inspirational, and visionary. Master number with great potential for enlightenment.",
+        22: "The Master Builder - Practical visionary, capable of turning dreams into reality. Master number with great potential for achievement.",
+        33: "The Master Teacher - Highly evolved spiritual teacher, healer, and guide. Master number dedicated to uplifting humanity."
+    },
+    "expression": {
+        1: "Destined to be a leader and pioneer. Your purpose is to initiate new projects and lead others toward success.",
+        2: "Destined to be a peacemaker and diplomat. Your purpose is to bring harmony and cooperation to relationships.",
+        3: "Destined to be a creative communicator. Your purpose is to inspire and entertain others through artistic expression.",
+        4: "Destined to be a builder and organizer. Your purpose is to create stable foundations and practical solutions.",
+        5: "Destined to be an adventurer and freedom fighter. Your purpose is to experience life fully and inspire change.",
+        6: "Destined to be a nurturer and healer. Your purpose is to care for others and create harmonious environments.",
+        7: "Destined to be a seeker of truth. Your purpose is to develop wisdom and share spiritual insights.",
+        8: "Destined to achieve material success. Your purpose is to master the material world and achieve recognition.",
+        9: "Destined to serve humanity. Your purpose is to be a humanitarian and make the world a better place.",
+        11: "Destined to be a spiritual messenger. Your purpose is to inspire and enlighten others through intuitive wisdom.",
+        22: "Destined to be a master builder. Your purpose is to create something of lasting value for humanity.",
+        33: "Destined to be a master teacher. Your purpose is to heal and uplift humanity through compassionate service."
+    },
+    "soul_urge": {
+        1: "Deep desire for independence and leadership. You want to be first and make your own decisions.",
+        2: "Deep desire for peace and cooperation. You want harmony in relationships and to work with others.",
+        3: "Deep desire for creative self-expression. You want to communicate, create, and inspire others.",
+        4: "Deep desire for security and order. You want stability, organization, and practical achievements.",
+        5: "Deep desire for freedom and adventure. You want variety, travel, and new experiences.",
+        6: "Deep desire to nurture and heal. You want to care for others and create beautiful, harmonious environments.",
+        7: "Deep desire for knowledge and understanding. You want to discover truth and develop spiritual wisdom.",
+        8: "Deep desire for material success and recognition. You want to achieve power and financial security.",
+        9: "Deep desire to serve humanity. You want to make a difference in the world and help others.",
+        11: "Deep desire for spiritual enlightenment. You want to inspire others and serve as a spiritual guide.",
+        22: "Deep desire to build something meaningful. You want to create lasting achievements that benefit humanity.",
+        33: "Deep desire to heal and teach. You want to serve as a compassionate guide and healer for others."
+    },
+    "personality": {
+        1: "Others see you as confident, independent, and strong. You appear to be a natural leader.",
+        2: "Others see you as gentle, cooperative, and diplomatic. You appear to be a peacemaker.",
+        3: "Others see you as creative, charming, and entertaining. You appear to be artistic and expressive.",
+        4: "Others see you as reliable, practical, and hardworking. You appear to be stable and trustworthy.",
+        5: "Others see you as adventurous, versatile, and exciting. You appear to be dynamic and progressive.",
+        6: "Others see you as caring, responsible, and nurturing. You appear to be a natural caregiver.",
+        7: "Others see you as mysterious, analytical, and wise. You appear to be deep and spiritual.",
+        8: "Others see you as successful, ambitious, and powerful. You appear to be business-minded and authoritative.",
+        9: "Others see you as compassionate, generous, and idealistic. You appear to be humanitarian and wise.",
+        11: "Others see you as intuitive, inspiring, and spiritual. You appear to be a visionary and guide.",
+        22: "Others see you as capable, practical, and visionary. You appear to be a master builder.",
+        33: "Others see you as healing, teaching, and compassionate. You appear to be a spiritual guide."
+    }
+})
+
+# Fallback meanings for number types without their own table
+_DEFAULT_MEANINGS = MappingProxyType({
+    1: "Leadership, independence, new beginnings",
+    2: "Cooperation, balance, relationships", 
+    3: "Creativity, communication, joy",
+    4: "Stability, hard work, foundation",
+    5: "Freedom, adventure, change",
+    6: "Nurturing, responsibility, home",
+    7: "Spirituality, analysis, introspection",
+    8: "Material success, power, achievement",
+    9: "Humanitarian service, completion, wisdom",
+    11: "Intuition, inspiration, enlightenment",
+    22: "Master builder, practical visionary",
+    33: "Master teacher, healer, guide"
+})
+
+
+def _digit_sum(number: int) -> int:
+    """Sum of decimal digits, by arithmetic rather than via str()"""
+    total = 0
+    while number:
+        number, digit = divmod(number, 10)
+        total += digit
+    return total
+
+
 class NumerologyService:
     def __init__(self):
         # Letter to number mapping for Pythagorean system
@@ -15,21 +102,40 @@ class NumerologyService:
             'S': 1, 'T': 2, 'U': 3, 'V': 4, 'W': 5, 'X': 6, 'Y': 7, 'Z': 8
         }
         
+        # Byte -> (letter value, vowel value) table (both cases; everything else
+        # counts 0), so a name is summed in one vectorized gather instead of
+        # per-character lookups
+        vowels = 'AEIOU'
+        self._value_table = np.zeros((256, 2), dtype=np.int64)
+        for letter, value in self.letter_values.items():
+            for code in (ord(letter), ord(letter.lower())):
+                self._value_table[code] = (value, value if letter in vowels else 0)
+        
         # Master numbers that are not reduced
         self.master_numbers = {11, 22, 33}
     
     def reduce_to_single_digit(self, number: int) -> int:
         """Reduce a number to single digit, preserving master numbers"""
         while number > 9 and number not in self.master_numbers:
-            number = sum(int(digit) for digit in str(number))
+            number = _digit_sum(number)
         return number
     
+    def _name_sums(self, full_name: str) -> Tuple[int, int, int]:
+        """(all letters, vowels, consonants) value totals from one encode of the name"""
+        # Upper-casing first keeps letters that only become ASCII there ("ß" -> "SS")
+        codes = np.frombuffer(full_name.upper().encode('ascii', 'ignore'), dtype=np.uint8)
+        total, vowel_total = self._value_table[codes].sum(axis=0).tolist()
+        return total, vowel_total, total - vowel_total
+    
     def calculate_life_path_number(self, birth_date: datetime) -> int:
         """Calculate Life Path Number from birth date"""
         try:
             # Sum all digits in the birth date
-            date_str = birth_date.strftime("%m%d%Y")
-            total = sum(int(digit) for digit in date_str)
+            total = (
+                _digit_sum(birth_date.month)
+                + _digit_sum(birth_date.day)
+                + _digit_sum(birth_date.year)
+            )
             return self.reduce_to_single_digit(total)
         except Exception as e:
             logger.error(f"Life path calculation error: {e}")
@@ -38,14 +144,7 @@ class NumerologyService:
     def calculate_expression_number(self, full_name: str) -> int:
         """Calculate Expression Number (Destiny Number) from full name"""
         try:
-            # Remove non-alphabetic characters and convert to uppercase
-            clean_name = re.sub(r'[^A-Za-z]', '', full_name.upper())
-            
-            total = 0
-            for letter in clean_name:
-                if letter in self.letter_values:
-                    total += self.letter_values[letter]
-            
+            total = self._name_sums(full_name)[0]
             return self.reduce_to_single_digit(total)
         except Exception as e:
             logger.error(f"Expression number calculation error: {e}")
@@ -54,14 +153,7 @@ class NumerologyService:
     def calculate_soul_urge_number(self, full_name: str) -> int:
         """Calculate Soul Urge Number from vowels in full name"""
         try:
-            vowels = 'AEIOU'
-            clean_name = re.sub(r'[^A-Za-z]', '', full_name.upper())
-            
-            total = 0
-            for letter in clean_name:
-                if letter in vowels and letter in self.letter_values:
-                    total += self.letter_values[letter]
-            
+            total = self._name_sums(full_name)[1]
             return self.reduce_to_single_digit(total)
         except Exception as e:
             logger.error(f"Soul urge calculation error: {e}")
@@ -70,14 +162,7 @@ class NumerologyService:
     def calculate_personality_number(self, full_name: str) -> int:
         """Calculate Personality Number from consonants in full name"""
         try:
-            vowels = 'AEIOU'
-            clean_name = re.sub(r'[^A-Za-z]', '', full_name.upper())
-            
-            total = 0
-            for letter in clean_name:
-                if letter not in vowels and letter in self.letter_values:
-                    total += self.letter_values[letter]
-            
+            total = self._name_sums(full_name)[2]
             return self.reduce_to_single_digit(total)
         except Exception as e:
             logger.error(f"Personality number calculation error: {e}")
@@ -95,8 +180,7 @@ class NumerologyService:
     def calculate_attitude_number(self, birth_date: datetime) -> int:
         """Calculate Attitude Number from birth month and day"""
         try:
-            month_day = int(f"{birth_date.month:02d}{birth_date.day:02d}")
-            total = sum(int(digit) for digit in str(month_day))
+            total = _digit_sum(birth_date.month) + _digit_sum(birth_date.day)
             return self.reduce_to_single_digit(total)
         except Exception as e:
             logger.error(f"Attitude number calculation error: {e}")
@@ -105,11 +189,13 @@ class NumerologyService:
     def calculate_all_numbers(self, full_name: str, birth_date: datetime) -> Dict[str, int]:
         """Calculate all numerology numbers for a person"""
         try:
+            # One pass over the name feeds all three name-based numbers
+            expression, soul_urge, personality = self._name_sums(full_name)
             return {
                 "life_path": self.calculate_life_path_number(birth_date),
-                "expression": self.calculate_expression_number(full_name),
-                "soul_urge": self.calculate_soul_urge_number(full_name),
-                "personality": self.calculate_personality_number(full_name),
+                "expression": self.reduce_to_single_digit(expression),
+                "soul_urge": self.reduce_to_single_digit(soul_urge),
+                "personality": self.reduce_to_single_digit(personality),
                 "birth_day": self.calculate_birth_day_number(birth_date),
                 "attitude": self.calculate_attitude_number(birth_date)
             }
@@ -119,83 +205,8 @@ class NumerologyService:
     
     def get_number_meaning(self, number: int, number_type: str) -> str:
         """Get meaning for a specific numerology number"""
-        meanings = {
-            "life_path": {
-                1: "The Leader - Independent, pioneering, ambitious, and strong-willed. Natural born leaders who are innovative and original.",
-                2: "The Peacemaker - Cooperative, diplomatic, sensitive, and patient. Excellent mediators who work well with others.",
-                3: "The Creative - Artistic, expressive, optimistic, and inspiring. Natural entertainers with great communication skills.",
-                4: "The Builder - Practical, hardworking, reliable, and organized. Excellent at creating solid foundations and systems.",
-                5: "The Freedom Seeker - Adventurous, versatile, curious, and progressive. Love variety and freedom in all aspects of life.",
-                6: "The Nurturer - Caring, responsible, protective, and healing. Natural caregivers who put family and community first.",
-                7: "The Seeker - Analytical, introspective, spiritual, and mysterious. Deep thinkers who seek truth and understanding.",
-                8: "The Achiever - Ambitious, material-focused, powerful, and business-minded. Natural ability to achieve material success.",
-                9: "The Humanitarian - Compassionate, generous, idealistic, and romantic. Dedicated to serving humanity and making the world better.",
-                11: "The Intuitive - Highly intuitive, spiritual, inspirational, and visionary. Master number with great potential for enlightenment.",
-                22: "The Master Builder - Practical visionary, capable of turning dreams into reality. Master number with great potential for achievement.",
-                33: "The Master Teacher - Highly evolved spiritual teacher, healer, and guide. Master number dedicated to uplifting humanity."
-            },
-            "expression": {
-                1: "Destined to be a leader and pioneer. Your purpose is to initiate new projects and lead others toward success.",
-                2: "Destined to be a peacemaker and diplomat. Your purpose is to bring harmony and cooperation to relationships.",
-                3: "Destined to be a creative communicator. Your purpose is to inspire and entertain others through artistic expression.",
-                4: "Destined to be a builder and organizer. Your purpose is to create stable foundations and practical solutions.",
-                5: "Destined to be an adventurer and freedom fighter. Your purpose is to experience life fully and inspire change.",
-                6: "Destined to be a nurturer and healer. Your purpose is to care for others and create harmonious environments.",
-                7: "Destined to be a seeker of truth. Your purpose is to develop wisdom and share spiritual insights.",
-                8: "Destined to achieve material success. Your purpose is to master the material world and achieve recognition.",
-                9: "Destined to serve humanity. Your purpose is to be a humanitarian and make the world a better place.",
-                11: "Destined to be a spiritual messenger. Your purpose is to inspire and enlighten others through intuitive wisdom.",
-                22: "Destined to be a master builder. Your purpose is to create something of lasting value for humanity.",
-                33: "Destined to be a master teacher. Your purpose is to heal and uplift humanity through compassionate service."
-            },
-            "soul_urge": {
-                1: "Deep desire for independence and leadership. You want to be first and make your own decisions.",
-                2: "Deep desire for peace and cooperation. You want harmony in relationships and to work with others.",
-                3: "Deep desire for creative self-expression. You want to communicate, create, and inspire others.",
-                4: "Deep desire for security and order. You want stability, organization, and practical achievements.",
-                5: "Deep desire for freedom and adventure. You want variety, travel, and new experiences.",
-                6: "Deep desire to nurture and heal. You want to care for others and create beautiful, harmonious environments.",
-                7: "Deep desire for knowledge and understanding. You want to discover truth and develop spiritual wisdom.",
-                8: "Deep desire for material success and recognition. You want to achieve power and financial security.",
-                9: "Deep desire to serve humanity. You want to make a difference in the world and help others.",
-                11: "Deep desire for spiritual enlightenment. You want to inspire others and serve as a spiritual guide.",
-                22: "Deep desire to build something meaningful. You want to create lasting achievements that benefit humanity.",
-                33: "Deep desire to heal and teach. You want to serve as a compassionate guide and healer for others."
-            },
-            "personality": {
-                1: "Others see you as confident, independent, and strong. You appear to be a natural leader.",
-                2: "Others see you as gentle, cooperative, and diplomatic. You appear to be a peacemaker.",
-                3: "Others see you as creative, charming, and entertaining. You appear to be artistic and expressive.",
-                4: "Others see you as reliable, practical, and hardworking. You appear to be stable and trustworthy.",
-                5: "Others see you as adventurous, versatile, and exciting. You appear to be dynamic and progressive.",
-                6: "Others see you as caring, responsible, and nurturing. You appear to be a natural caregiver.",
-                7: "Others see you as mysterious, analytical, and wise. You appear to be deep and spiritual.",
-                8: "Others see you as successful, ambitious, and powerful. You appear to be business-minded and authoritative.",
-                9: "Others see you as compassionate, generous, and idealistic. You appear to be humanitarian and wise.",
-                11: "Others see you as intuitive, inspiring, and spiritual. You appear to be a visionary and guide.",
-                22: "Others see you as capable, practical, and visionary. You appear to be a master builder.",
-                33: "Others see you as healing, teaching, and compassionate. You appear to be a spiritual guide."
-            }
-        }
-        
-        # Default meanings for other number types
-        default_meanings = {
-            1: "Leadership, independence, new beginnings",
-            2: "Cooperation, balance, relationships", 
-            3: "Creativity, communication, joy",
-            4: "Stability, hard work, foundation",
-            5: "Freedom, adventure, change",
-            6: "Nurturing, responsibility, home",
-            7: "Spirituality, analysis, introspection",
-            8: "Material success, power, achievement",
-            9: "Humanitarian service, completion, wisdom",
-            11: "Intuition, inspiration, enlightenment",
-            22: "Master builder, practical visionary",
-            33: "Master teacher, healer, guide"
-        }
-        
-        number_meanings = meanings.get(number_type, {})
-        return number_meanings.get(number, default_meanings.get(number, "Unknown meaning"))
+        number_meanings = _MEANINGS.get(number_type, {})
+        return number_meanings.get(number, _DEFAULT_MEANINGS.get(number, "Unknown meaning"))
     
     def create_full_reading(self, full_name: str, birth_date: datetime) -> Dict[str, Any]:
         """Create a complete numerology reading"""
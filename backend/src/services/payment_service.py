@@ -1,6 +1,7 @@
 from typing import Optional
 import logging
 import httpx
+import orjson
 
 from src.config import settings
 
@@ -13,6 +14,25 @@ class PaymentService:
     def __init__(self) -> None:
         self.token = settings.telegram_stars_token
         self.api_url = f"https://api.telegram.org/bot{self.token}" if self.token else None
+        # Created on first use, inside the event loop that will use it
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Keep-alive HTTP/2 client shared by every Bot API call"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers={"Content-Type": "application/json"},
+                transport=httpx.AsyncHTTPTransport(http2=True),
+                timeout=10.0
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the HTTP client; the next call creates a new one."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
 
     async def create_stars_invoice(self, title: str, description: str, payload: str, amount: int) -> Optional[str]:
         """Create invoice link using Telegram Stars API.
@@ -23,7 +43,6 @@ class PaymentService:
             logger.warning("Telegram Stars token not configured")
             return None
 
-        url = f"{self.api_url}/createInvoiceLink"
         data = {
             "title": title,
             "description": description,
@@ -33,11 +52,11 @@ class PaymentService:
             "prices": [{"label": title, "amount": amount}],
         }
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(url, json=data)
-                r.raise_for_status()
-                resp = r.json()
-                return resp.get("result")
+            # Bodies are encoded straight to bytes with orjson
+            r = await self._get_client().post("/createInvoiceLink", content=orjson.dumps(data))
+            r.raise_for_status()
+            resp = orjson.loads(r.content)
+            return resp.get("result")
         except Exception as e:
             logger.error(f"Failed to create invoice: {e}")
             return None
@@ -1,4 +1,5 @@
 import random
+from types import MappingProxyType
 from typing import Dict, List, Any, Optional
 from src.config import TAROT_CARDS
 import logging
@@ -6,9 +7,132 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# Blank line plus heading that precedes the card list in a formatted reading
+_CARDS_DRAWN_HEADER = "\n🃏 Cards drawn:"
+
+# A card is reversed when its random byte is below this (77 / 256 ≈ 30%)
+_REVERSED_BELOW = 77
+
+# Basic card meanings (simplified for demo)
+_CARD_MEANINGS = MappingProxyType({
+    # Major Arcana
+    "The Fool": {
+        "upright": "New beginnings, innocence, spontaneity, free spirit",
+        "reversed": "Recklessness, taken advantage of, inconsideration"
+    },
+    "The Magician": {
+        "upright": "Manifestation, resourcefulness, power, inspired action",
+        "reversed": "Manipulation, poor planning, untapped talents"
+    },
+    "The High Priestess": {
+        "upright": "Intuition, sacred knowledge, divine feminine, subconscious mind",
+        "reversed": "Secrets, disconnected from intuition, withdrawal"
+    },
+    "The Empress": {
+        "upright": "Femininity, beauty, nature, nurturing, abundance",
+        "reversed": "Creative block, dependence on others"
+    },
+    "The Emperor": {
+        "upright": "Authority, establishment, structure, father figure",
+        "reversed": "Domination, excessive control, lack of discipline"
+    },
+    "The Hierophant": {
+        "upright": "Spiritual wisdom, religious beliefs, conformity, tradition",
+        "reversed": "Personal beliefs, freedom, challenging the status quo"
+    },
+    "The Lovers": {
+        "upright": "Love, harmony, relationships, values alignment",
+        "reversed": "Self-love, disharmony, imbalance, misalignment"
+    },
+    "The Chariot": {
+        "upright": "Control, willpower, success, determination",
+        "reversed": "Self-discipline, opposition, lack of direction"
+    },
+    "Strength": {
+        "upright": "Strength, courage, persuasion, influence, compassion",
+        "reversed": "Self doubt, low energy, raw emotion"
+    },
+    "The Hermit": {
+        "upright": "Soul searching, introspection, inner guidance",
+        "reversed": "Isolation, loneliness, withdrawal"
+    },
+    "Wheel of Fortune": {
+        "upright": "Good luck, karma, life cycles, destiny, turning point",
+        "reversed": "Bad luck, lack of control, clinging to control"
+    },
+    "Justice": {
+        "upright": "Justice, fairness, truth, cause and effect, law",
+        "reversed": "Unfairness, lack of accountability, dishonesty"
+    },
+    "The Hanged Man": {
+        "upright": "Suspension, restriction, letting go, sacrifice",
+        "reversed": "Martyrdom, indecision, delay"
+    },
+    "Death": {
+        "upright": "Endings, beginnings, change, transformation, transition",
+        "reversed": "Resistance to change, personal transformation, inner purging"
+    },
+    "Temperance": {
+        "upright": "Balance, moderation, patience, purpose",
+        "reversed": "Imbalance, excess, self-healing, re-alignment"
+    },
+    "The Devil": {
+        "upright": "Bondage, addiction, sexuality, materialism",
+        "reversed": "Releasing limiting beliefs, exploring dark thoughts, detachment"
+    },
+    "The Tower": {
+        "upright": "Sudden change, upheaval, chaos, revelation, awakening",
+        "reversed": "Personal transformation, fear of change, averting disaster"
+    },
+    "The Star": {
+        "upright": "Hope, faith, purpose, renewal, spirituality",
+        "reversed": "Lack of faith, despair, self-trust, disconnection"
+    },
+    "The Moon": {
+        "upright": "Illusion, fear, anxiety, subconscious, intuition",
+        "reversed": "Release of fear, repressed emotion, inner confusion"
+    },
+    "The Sun": {
+        "upright": "Positivity, fun, warmth, success, vitality",
+        "reversed": "Inner child, feeling down, overly optimistic"
+    },
+    "Judgement": {
+        "upright": "Judgement, rebirth, inner calling, absolution",
+        "reversed": "Self-doubt, inner critic, ignoring the call"
+    },
+    "The World": {
+        "upright": "Completion, integration, accomplishment, travel",
+        "reversed": "Seeking personal closure, short-cut to success"
+    }
+})
+
+# Default meaning for cards not in _CARD_MEANINGS
+_DEFAULT_CARD_MEANING = MappingProxyType({
+    "upright": "Positive energy, growth, opportunity",
+    "reversed": "Blocked energy, internal challenges, reflection needed"
+})
+
+# The same meanings as (upright, reversed) pairs, indexed directly by is_reversed
+_ORIENTATIONS = ("upright", "reversed")
+_CARD_MEANING_PAIRS = MappingProxyType({
+    name: (meaning["upright"], meaning["reversed"]) for name, meaning in _CARD_MEANINGS.items()
+})
+_DEFAULT_CARD_MEANING_PAIR = (_DEFAULT_CARD_MEANING["upright"], _DEFAULT_CARD_MEANING["reversed"])
+
+# Spread descriptions shown alongside the spread listing
+_SPREAD_DESCRIPTIONS = MappingProxyType({
+    "single": "A single card draw for quick insight into your current situation or a specific question.",
+    "three_card": "A classic three-card spread exploring the past, present, and future influences on your situation.",
+    "relationship": "A three-card spread focused on relationship dynamics, exploring you, your partner, and the relationship itself.",
+    "career": "A three-card spread for career guidance, examining your current situation, challenges, and advice for moving forward.",
+    "celtic_cross": "The most comprehensive spread, providing deep insight into all aspects of your situation with 10 cards representing different influences and outcomes."
+})
+
+
 class TarotService:
     def __init__(self):
-        self.deck = TAROT_CARDS.copy()
+        self.deck = TAROT_CARDS
+        self._rng = random.Random()
         
         # Tarot spread configurations
         self.spreads = {
@@ -49,23 +173,36 @@ class TarotService:
                 "card_count": 10
             }
         }
+        
+        # Spread listing is static, so it is assembled once
+        self._spreads_info = {
+            spread_type: {
+                "name": config["name"],
+                "card_count": config["card_count"],
+                "description": self.get_spread_description(spread_type),
+                "positions": config["positions"]
+            }
+            for spread_type, config in self.spreads.items()
+        }
     
     def shuffle_deck(self) -> List[str]:
         """Shuffle the tarot deck"""
-        shuffled = self.deck.copy()
+        shuffled = list(self.deck)
         random.shuffle(shuffled)
         return shuffled
     
     def draw_cards(self, count: int) -> List[Dict[str, Any]]:
         """Draw specified number of cards from shuffled deck"""
         try:
-            shuffled_deck = self.shuffle_deck()
-            drawn_cards = shuffled_deck[:count]
+            # Partial shuffle: only the drawn cards are picked, no full-deck copy
+            drawn_cards = self._rng.sample(self.deck, count)
+            # One random byte per card from a single RNG call
+            reversal_bits = self._rng.getrandbits(8 * count) if count else 0
             
             cards = []
             for i, card_name in enumerate(drawn_cards):
                 # Randomly determine if card is reversed (30% chance)
-                is_reversed = random.random() < 0.3
+                is_reversed = (reversal_bits >> (8 * i)) & 0xFF < _REVERSED_BELOW
                 
                 cards.append({
                     "name": card_name,
@@ -117,140 +254,31 @@ class TarotService:
     
     def get_card_meaning(self, card_name: str, is_reversed: bool = False) -> Dict[str, str]:
         """Get basic meaning for a tarot card"""
-        # Basic card meanings (simplified for demo)
-        card_meanings = {
-            # Major Arcana
-            "The Fool": {
-                "upright": "New beginnings, innocence, spontaneity, free spirit",
-                "reversed": "Recklessness, taken advantage of, inconsideration"
-            },
-            "The Magician": {
-                "upright": "Manifestation, resourcefulness, power, inspired action",
-                "reversed": "Manipulation, poor planning, untapped talents"
-            },
-            "The High Priestess": {
-                "upright": "Intuition, sacred knowledge, divine feminine, subconscious mind",
-                "reversed": "Secrets, disconnected from intuition, withdrawal"
-            },
-            "The Empress": {
-                "upright": "Femininity, beauty, nature, nurturing, abundance",
-                "reversed": "Creative block, dependence on others"
-            },
-            "The Emperor": {
-                "upright": "Authority, establishment, structure, father figure",
-                "reversed": "Domination, excessive control, lack of discipline"
-            },
-            "The Hierophant": {
-                "upright": "Spiritual wisdom, religious beliefs, conformity, tradition",
-                "reversed": "Personal beliefs, freedom, challenging the status quo"
-            },
-            "The Lovers": {
-                "upright": "Love, harmony, relationships, values alignment",
-                "reversed": "Self-love, disharmony, imbalance, misalignment"
-            },
-            "The Chariot": {
-                "upright": "Control, willpower, success, determination",
-                "reversed": "Self-discipline, opposition, lack of direction"
-            },
-            "Strength": {
-                "upright": "Strength, courage, persuasion, influence, compassion",
-                "reversed": "Self doubt, low energy, raw emotion"
-            },
-            "The Hermit": {
-                "upright": "Soul searching, introspection, inner guidance",
-                "reversed": "Isolation, loneliness, withdrawal"
-            },
-            "Wheel of Fortune": {
-                "upright": "Good luck, karma, life cycles, destiny, turning point",
-                "reversed": "Bad luck, lack of control, clinging to control"
-            },
-            "Justice": {
-                "upright": "Justice, fairness, truth, cause and effect, law",
-                "reversed": "Unfairness, lack of accountability, dishonesty"
-            },
-            "The Hanged Man": {
-                "upright": "Suspension, restriction, letting go, sacrifice",
-                "reversed": "Martyrdom, indecision, delay"
-            },
-            "Death": {
-                "upright": "Endings, beginnings, change, transformation, transition",
-                "reversed": "Resistance to change, personal transformation, inner purging"
-            },
-            "Temperance": {
-                "upright": "Balance, moderation, patience, purpose",
-                "reversed": "Imbalance, excess, self-healing, re-alignment"
-            },
-            "The Devil": {
-                "upright": "Bondage, addiction, sexuality, materialism",
-                "reversed": "Releasing limiting beliefs, exploring dark thoughts, detachment"
-            },
-            "The Tower": {
-                "upright": "Sudden change, upheaval, chaos, revelation, awakening",
-                "reversed": "Personal transformation, fear of change, averting disaster"
-            },
-            "The Star": {
-                "upright": "Hope, faith, purpose, renewal, spirituality",
-                "reversed": "Lack of faith, despair, self-trust, disconnection"
-            },
-            "The Moon": {
-                "upright": "Illusion, fear, anxiety, subconscious, intuition",
-                "reversed": "Release of fear, repressed emotion, inner confusion"
-            },
-            "The Sun": {
-                "upright": "Positivity, fun, warmth, success, vitality",
-                "reversed": "Inner child, feeling down, overly optimistic"
-            },
-            "Judgement": {
-                "upright": "Judgement, rebirth, inner calling, absolution",
-                "reversed": "Self-doubt, inner critic, ignoring the call"
-            },
-            "The World": {
-                "upright": "Completion, integration, accomplishment, travel",
-                "reversed": "Seeking personal closure, short-cut to success"
-            }
-        }
-        
-        # Default meaning for cards not in dictionary
-        default_meaning = {
-            "upright": "Positive energy, growth, opportunity",
-            "reversed": "Blocked energy, internal challenges, reflection needed"
-        }
-        
-        meaning = card_meanings.get(card_name, default_meaning)
+        orientation = 1 if is_reversed else 0
         return {
             "card": card_name,
-            "meaning": meaning["reversed"] if is_reversed else meaning["upright"],
-            "orientation": "reversed" if is_reversed else "upright"
+            "meaning": _CARD_MEANING_PAIRS.get(card_name, _DEFAULT_CARD_MEANING_PAIR)[orientation],
+            "orientation": _ORIENTATIONS[orientation]
         }
     
     def get_spread_description(self, spread_type: str) -> str:
         """Get description of a tarot spread"""
-        descriptions = {
-            "single": "A single card draw for quick insight into your current situation or a specific question.",
-            "three_card": "A classic three-card spread exploring the past, present, and future influences on your situation.",
-            "relationship": "A three-card spread focused on relationship dynamics, exploring you, your partner, and the relationship itself.",
-            "career": "A three-card spread for career guidance, examining your current situation, challenges, and advice for moving forward.",
-            "celtic_cross": "The most comprehensive spread, providing deep insight into all aspects of your situation with 10 cards representing different influences and outcomes."
-        }
-        
-        return descriptions.get(spread_type, "A tarot spread for gaining insight and guidance.")
+        return _SPREAD_DESCRIPTIONS.get(spread_type, "A tarot spread for gaining insight and guidance.")
     
     def format_reading_for_display(self, reading: Dict[str, Any]) -> str:
         """Format a reading for text display"""
         try:
-            lines = []
-            lines.append(f"🔮 {reading['spread_name']}")
-            
-            if reading.get('question'):
-                lines.append(f"❓ Question: {reading['question']}")
+            lines = [f"🔮 {reading['spread_name']}"]
             
-            lines.append("")
-            lines.append("🃏 Cards drawn:")
+            question = reading.get('question')
+            if question:
+                lines.append(f"❓ Question: {question}")
             
-            for card in reading['cards']:
-                position = card.get('position', 'Unknown')
-                display_name = card.get('display_name', card['name'])
-                lines.append(f"• {position}: {display_name}")
+            lines.append(_CARDS_DRAWN_HEADER)
+            lines.extend(
+                f"• {card.get('position', 'Unknown')}: {card.get('display_name', card['name'])}"
+                for card in reading['cards']
+            )
             
             return "\n".join(lines)
             
@@ -260,16 +288,7 @@ class TarotService:
     
     def get_available_spreads(self) -> Dict[str, Dict[str, Any]]:
         """Get all available tarot spreads with descriptions"""
-        spreads_info = {}
-        for spread_type, config in self.spreads.items():
-            spreads_info[spread_type] = {
-                "name": config["name"],
-                "card_count": config["card_count"],
-                "description": self.get_spread_description(spread_type),
-                "positions": config["positions"]
-            }
-        
-        return spreads_info
+        return self._spreads_info
 
 
 # Global tarot service instance
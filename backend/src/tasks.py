@@ -1,117 +1,316 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
+import random
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional
 
 from celery import Task
-from sqlalchemy import select, delete, and_
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy import select, delete, and_, exists
 # Note: Celery tasks use python-telegram-bot to deliver scheduled messages
 # such as daily horoscopes directly from this Python backend. The interactive
 # Telegram bot runs with Telegraf.js in the `bot/` service, so we keep both
 # libraries in the project.
-from telegram import Bot
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
 
 from src.celery_app import celery_app
 from src.config import settings
-from src.database import get_async_db
+from src.database import async_engine, get_async_db, invalidate_user_snapshots
 from src.models import User, Horoscope, TarotReading
-from src.services.ai_service import ai_service
+from src.services.ai_service import get_ai_service, close_ai_service
+from src.services.astrology_service import astrology_service
+from src.services.tarot_service import tarot_service
 
 logger = logging.getLogger(__name__)
 
+# Width of each send-daily-horoscopes beat window; must match the beat schedule
+HOROSCOPE_WINDOW_MINUTES = 5
+
+# Weekly insights generated and sent at the same time
+WEEKLY_INSIGHTS_CONCURRENCY = 32
+
+# Rows per fetch or page when scheduled tasks scan users
+USER_SCAN_BATCH_SIZE = 500
+
+# Rows removed per transaction by cleanup_old_data, bounding lock time and WAL bursts
+CLEANUP_BATCH_SIZE = 10000
+
+
+# One event loop per worker process, so pooled DB connections and HTTP clients
+# survive from one task to the next instead of being rebuilt for every task
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+@worker_process_init.connect
+def _init_worker_loop(**kwargs):
+    _get_worker_loop()
+
+
+@worker_process_shutdown.connect
+def _close_worker_loop(**kwargs):
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    loop, _worker_loop = _worker_loop, None
+    try:
+        loop.run_until_complete(_close_clients())
+    finally:
+        loop.close()
+
+
+async def _close_clients():
+    await close_ai_service()
+    await close_bot()
+    await async_engine.dispose()
+
 
 class AsyncTask(Task):
     """Base task class for async operations"""
     
     def __call__(self, *args, **kwargs):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(self.run_async(*args, **kwargs))
-        finally:
-            loop.close()
+        return _get_worker_loop().run_until_complete(self.run(*args, **kwargs))
+
+
+# Birth data sent with horoscope requests: prompt key -> User attribute
+_HOROSCOPE_USER_KEYS = ("birth_date", "birth_time", "birth_place", "birth_latitude", "birth_longitude")
+_horoscope_user_fields = attrgetter(
+    "birth_date_iso", "birth_time_str", "birth_place", "birth_latitude", "birth_longitude"
+)
+
+
+def _horoscope_user_data(user: User) -> dict:
+    """User birth data in the shape generate_horoscope expects"""
+    return dict(zip(_HOROSCOPE_USER_KEYS, _horoscope_user_fields(user)))
+
+
+# Shared Bot API client, created lazily inside the running event loop
+_bot: Optional[Bot] = None
+
+
+async def get_bot() -> Bot:
+    """Return the worker's Bot, creating and initializing it on first use"""
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=settings.telegram_bot_token)
+    # No-op once initialized
+    await _bot.initialize()
+    return _bot
+
+
+async def close_bot():
+    """Shut down the shared Bot; the next get_bot() call creates a new one"""
+    global _bot
+    if _bot is not None:
+        bot, _bot = _bot, None
+        await bot.shutdown()
+
+
+async def _deliver(chat_id: int, text: str):
+    """Send a finished reading to the user with a main menu button"""
+    reply_markup = InlineKeyboardMarkup(
+        [[InlineKeyboardButton("🏠 Main Menu", callback_data="back_main")]]
+    )
+    bot = await get_bot()
+    await bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+
+
+async def _load_user(user_id: int) -> Optional[User]:
+    """Load a user without holding a connection during AI generation"""
+    async with get_async_db() as db:
+        return await db.get(User, user_id)
+
+
+async def _create_daily_horoscope(user: User, today) -> str:
+    """Generate a user's daily horoscope and store it; returns the text"""
+    horoscope_content = await get_ai_service().generate_horoscope(
+        _horoscope_user_data(user), "daily", user.language_code
+    )
     
-    async def run_async(self, *args, **kwargs):
-        raise NotImplementedError
+    async with get_async_db() as db, db.begin():
+        db.add(Horoscope(
+            user_id=user.id,
+            horoscope_type="daily",
+            content=horoscope_content,
+            date_for=today,
+            ai_model_used=settings.ai_model
+        ))
+    return horoscope_content
+
+
+@lru_cache(maxsize=2)
+def _daily_horoscope_header(today: date) -> str:
+    """Message header for a day's scheduled horoscopes, formatted once per day"""
+    return f"🌟 Your Daily Horoscope for {today.strftime('%B %d, %Y')}\n\n"
+
+
+@celery_app.task(base=AsyncTask, bind=True)
+async def deliver_horoscope(self, user_id: int, chat_id: int):
+    """Generate a daily horoscope requested in the bot and send it"""
+    try:
+        user = await _load_user(user_id)
+        if user is None:
+            logger.warning(f"Not delivering horoscope: user {user_id} no longer exists")
+            return
+        horoscope_content = await _create_daily_horoscope(user, datetime.now().date())
+        
+        await _deliver(chat_id, f"🌟 Your Daily Horoscope\n\n{horoscope_content}")
+        
+    except Exception as e:
+        logger.error(f"Error delivering horoscope to user {user_id}: {e}")
+        raise
+
+
+@celery_app.task(base=AsyncTask, bind=True)
+async def deliver_tarot_reading(self, user_id: int, chat_id: int, spread_type: str,
+                                question: str = None, language: str = "en"):
+    """Draw and interpret a tarot spread requested in the bot and send it"""
+    try:
+        reading = tarot_service.create_reading(spread_type, question)
+        
+        interpretation = await get_ai_service().generate_tarot_interpretation(
+            reading["cards"], spread_type, question, language
+        )
+        
+        async with get_async_db() as db, db.begin():
+            db.add(TarotReading(
+                user_id=user_id,
+                reading_type=spread_type,
+                question=question,
+                cards_drawn=reading["cards"],
+                interpretation=interpretation,
+                ai_model_used=settings.ai_model
+            ))
+        
+        cards_text = tarot_service.format_reading_for_display(reading)
+        await _deliver(chat_id, f"{cards_text}\n\n🔮 Interpretation:\n{interpretation}")
+        
+    except Exception as e:
+        logger.error(f"Error delivering tarot reading to user {user_id}: {e}")
+        raise
+
+
+@celery_app.task(base=AsyncTask, bind=True)
+async def deliver_natal_chart(self, user_id: int, chat_id: int):
+    """Calculate and interpret a natal chart requested in the bot and send it"""
+    try:
+        user = await _load_user(user_id)
+        if user is None:
+            logger.warning(f"Not delivering natal chart: user {user_id} no longer exists")
+            return
+        birth_datetime = datetime.combine(user.birth_date.date(), user.birth_time or time(12, 0))
+        
+        chart_data = await astrology_service.calculate_natal_chart_async(
+            birth_datetime, user.birth_latitude, user.birth_longitude
+        )
+        
+        interpretation = await get_ai_service().generate_natal_chart_interpretation(
+            chart_data, user.language_code
+        )
+        
+        await _deliver(chat_id, f"🪐 Your Natal Chart\n\n{interpretation}")
+        
+    except Exception as e:
+        logger.error(f"Error delivering natal chart to user {user_id}: {e}")
+        raise
 
 
 @celery_app.task(base=AsyncTask, bind=True)
 async def send_daily_horoscopes(self):
-    """Send daily horoscopes to users at their preferred time"""
+    """Queue daily horoscopes for users whose preferred time falls in this 5-minute window"""
     try:
-        current_hour = datetime.now().hour
+        now = datetime.now()
+        today = now.date()
+        # Window as minutes of the day; the last one of the day ends at 1440
+        minute_of_day = now.hour * 60 + now.minute
+        window_start = minute_of_day - minute_of_day % HOROSCOPE_WINDOW_MINUTES
+        window_end = window_start + HOROSCOPE_WINDOW_MINUTES
+        
+        # Users who already got today's horoscope are filtered out in the same
+        # query instead of queueing a task per user just to find that out
+        already_sent = select(Horoscope.user_id).where(
+            and_(
+                Horoscope.date_for == today,
+                Horoscope.horoscope_type == "daily"
+            )
+        )
         
+        # Ids are streamed from a server-side cursor and queued as they arrive.
+        # Sends are spread across the window so Telegram and the AI provider
+        # see a steady trickle instead of a burst at the top of the hour
+        queued = 0
         async with get_async_db() as db:
-            # Get users who should receive horoscope at this hour
-            result = await db.execute(
-                select(User).where(
+            result = await db.stream(
+                select(User.id).where(
                     and_(
-                        User.preferred_horoscope_time.like(f"{current_hour:02d}:%"),
+                        User.preferred_horoscope_minute >= window_start,
+                        User.preferred_horoscope_minute < window_end,
                         User.is_active == True,
-                        User.birth_date.isnot(None)
+                        User.birth_date.isnot(None),
+                        User.id.not_in(already_sent)
                     )
-                )
+                ).execution_options(yield_per=USER_SCAN_BATCH_SIZE)
             )
-            users = result.scalars().all()
-            
-            bot = Bot(token=settings.telegram_bot_token)
-            sent_count = 0
+            async for user_id in result.scalars():
+                send_one_horoscope.apply_async(
+                    args=[user_id],
+                    countdown=random.randint(0, HOROSCOPE_WINDOW_MINUTES * 60)
+                )
+                queued += 1
+        
+        logger.info(
+            f"Queued {queued} daily horoscopes for "
+            f"{window_start // 60:02d}:{window_start % 60:02d}-{window_end // 60:02d}:{window_end % 60:02d}"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error in send_daily_horoscopes task: {e}")
+        raise
+
+
+@celery_app.task(base=AsyncTask, bind=True)
+async def send_one_horoscope(self, user_id: int):
+    """Generate and send today's scheduled horoscope to a single user"""
+    try:
+        today = datetime.now().date()
+        
+        async with get_async_db() as db:
+            user = await db.get(User, user_id)
+            if not user or not user.is_active:
+                return
             
-            for user in users:
-                try:
-                    # Check if user already received horoscope today
-                    today = datetime.now().date()
-                    existing_horoscope = await db.execute(
-                        select(Horoscope).where(
-                            and_(
-                                Horoscope.user_id == user.id,
-                                Horoscope.date_for == today,
-                                Horoscope.horoscope_type == "daily"
-                            )
-                        )
-                    )
-                    
-                    if existing_horoscope.scalar_one_or_none():
-                        continue  # Already sent today
-                    
-                    # Generate horoscope
-                    user_data = {
-                        "birth_date": user.birth_date.strftime("%Y-%m-%d") if user.birth_date else None,
-                        "birth_time": user.birth_time,
-                        "birth_place": user.birth_place,
-                        "birth_latitude": user.birth_latitude,
-                        "birth_longitude": user.birth_longitude
-                    }
-                    
-                    horoscope_content = await ai_service.generate_horoscope(
-                        user_data, "daily", user.language_code
-                    )
-                    
-                    # Save to database
-                    horoscope = Horoscope(
-                        user_id=user.id,
-                        horoscope_type="daily",
-                        content=horoscope_content,
-                        date_for=today,
-                        ai_model_used=settings.ai_model
+            # Check if user already received horoscope today
+            already_sent = await db.scalar(
+                select(exists().where(
+                    and_(
+                        Horoscope.user_id == user.id,
+                        Horoscope.date_for == today,
+                        Horoscope.horoscope_type == "daily"
                     )
-                    db.add(horoscope)
-                    
-                    # Send to user
-                    message = f"🌟 Your Daily Horoscope for {today.strftime('%B %d, %Y')}\n\n{horoscope_content}"
-                    await bot.send_message(chat_id=user.telegram_id, text=message)
-                    
-                    sent_count += 1
-                    logger.info(f"Sent daily horoscope to user {user.telegram_id}")
-                    
-                except Exception as e:
-                    logger.error(f"Error sending horoscope to user {user.telegram_id}: {e}")
-                    continue
-            
-            await db.commit()
-            logger.info(f"Sent {sent_count} daily horoscopes")
-            
+                ))
+            )
+            if already_sent:
+                return  # Already sent today
+        
+        horoscope_content = await _create_daily_horoscope(user, today)
+        
+        message = _daily_horoscope_header(today) + horoscope_content
+        bot = await get_bot()
+        await bot.send_message(chat_id=user.telegram_id, text=message)
+        
+        logger.info(f"Sent daily horoscope to user {user.telegram_id}")
+        
     except Exception as e:
-        logger.error(f"Error in send_daily_horoscopes task: {e}")
+        logger.error(f"Error sending daily horoscope to user {user_id}: {e}")
         raise
 
 
@@ -119,51 +318,57 @@ async def send_daily_horoscopes(self):
 async def reset_usage_counters(self):
     """Reset daily/weekly usage counters"""
     try:
-        async with get_async_db() as db:
-            # Reset daily counters
-            await db.execute(
-                "UPDATE users SET daily_horoscopes_used = 0"
+        async with get_async_db() as db, db.begin():
+            # Daily counters of every user, weekly ones when a new week started
+            result = await db.execute(
+                User.reset_usage_counters_statement(datetime.utcnow()).returning(User.telegram_id)
             )
-            
-            # Reset weekly counters on Mondays
-            if datetime.now().weekday() == 0:  # Monday
-                await db.execute(
-                    "UPDATE users SET weekly_tarot_readings_used = 0"
-                )
-                logger.info("Reset weekly usage counters")
-            
-            await db.commit()
-            logger.info("Reset daily usage counters")
+            telegram_ids = result.scalars().all()
+        
+        # Cached bot snapshots still hold the old counters
+        await invalidate_user_snapshots(telegram_ids)
+        logger.info(f"Reset usage counters for {len(telegram_ids)} users")
             
     except Exception as e:
         logger.error(f"Error in reset_usage_counters task: {e}")
         raise
 
 
+async def _delete_in_batches(model, condition) -> int:
+    """Delete matching rows CLEANUP_BATCH_SIZE at a time, one short transaction each"""
+    deleted = 0
+    while True:
+        batch = select(model.id).where(condition).limit(CLEANUP_BATCH_SIZE).scalar_subquery()
+        async with get_async_db() as db, db.begin():
+            result = await db.execute(
+                delete(model)
+                .where(model.id.in_(batch))
+                # Bulk statement: no loaded objects to keep in sync
+                .execution_options(synchronize_session=False)
+            )
+        deleted += result.rowcount
+        if result.rowcount < CLEANUP_BATCH_SIZE:
+            return deleted
+
+
 @celery_app.task(base=AsyncTask, bind=True)
 async def cleanup_old_data(self):
     """Clean up old data to save storage space"""
     try:
-        async with get_async_db() as db:
-            # Delete horoscopes older than 30 days
-            thirty_days_ago = datetime.now().date() - timedelta(days=30)
-            
-            result = await db.execute(
-                delete(Horoscope).where(Horoscope.date_for < thirty_days_ago)
-            )
-            horoscopes_deleted = result.rowcount
-            
-            # Delete tarot readings older than 90 days
-            ninety_days_ago = datetime.now() - timedelta(days=90)
-            
-            result = await db.execute(
-                delete(TarotReading).where(TarotReading.created_at < ninety_days_ago)
-            )
-            tarot_deleted = result.rowcount
-            
-            await db.commit()
-            logger.info(f"Cleaned up {horoscopes_deleted} old horoscopes and {tarot_deleted} old tarot readings")
-            
+        now = datetime.now()
+        
+        # Delete horoscopes older than 30 days
+        horoscopes_deleted = await _delete_in_batches(
+            Horoscope, Horoscope.date_for < now.date() - timedelta(days=30)
+        )
+        
+        # Delete tarot readings older than 90 days
+        tarot_deleted = await _delete_in_batches(
+            TarotReading, TarotReading.created_at < now - timedelta(days=90)
+        )
+        
+        logger.info(f"Cleaned up {horoscopes_deleted} old horoscopes and {tarot_deleted} old tarot readings")
+        
     except Exception as e:
         logger.error(f"Error in cleanup_old_data task: {e}")
         raise
@@ -182,65 +387,88 @@ async def send_mercury_retrograde_alert(self):
         raise
 
 
+async def _send_weekly_insights(bot: Bot, user: User, today, slots: asyncio.Semaphore):
+    """Generate and send one user's weekly insights; returns (Horoscope or None, sent)"""
+    async with slots:
+        try:
+            # Generate weekly horoscope
+            weekly_content = await get_ai_service().generate_horoscope(
+                _horoscope_user_data(user), "weekly", user.language_code
+            )
+        except Exception as e:
+            logger.error(f"Error sending weekly insights to user {user.telegram_id}: {e}")
+            return None, False
+        
+        horoscope = Horoscope(
+            user_id=user.id,
+            horoscope_type="weekly",
+            content=weekly_content,
+            date_for=today,
+            ai_model_used=settings.ai_model
+        )
+        
+        try:
+            # Send to user
+            message = f"🌟 Your Weekly Insights\n\n{weekly_content}"
+            await bot.send_message(chat_id=user.telegram_id, text=message)
+        except Exception as e:
+            logger.error(f"Error sending weekly insights to user {user.telegram_id}: {e}")
+            return horoscope, False
+        
+        logger.info(f"Sent weekly insights to user {user.telegram_id}")
+        return horoscope, True
+
+
 @celery_app.task(base=AsyncTask, bind=True)
 async def generate_weekly_insights(self):
     """Generate weekly astrological insights for premium users"""
     try:
-        async with get_async_db() as db:
-            # Get premium users
-            result = await db.execute(
-                select(User).where(
-                    and_(
-                        User.is_premium == True,
-                        User.is_active == True,
-                        User.birth_date.isnot(None)
-                    )
-                )
+        today = datetime.now().date()
+        # Everyone who already got this week's insights today is skipped in SQL
+        already_sent = select(Horoscope.user_id).where(
+            and_(
+                Horoscope.date_for == today,
+                Horoscope.horoscope_type == "weekly"
             )
-            users = result.scalars().all()
-            
-            bot = Bot(token=settings.telegram_bot_token)
-            sent_count = 0
-            
-            for user in users:
-                try:
-                    # Generate weekly horoscope
-                    user_data = {
-                        "birth_date": user.birth_date.strftime("%Y-%m-%d") if user.birth_date else None,
-                        "birth_time": user.birth_time,
-                        "birth_place": user.birth_place,
-                        "birth_latitude": user.birth_latitude,
-                        "birth_longitude": user.birth_longitude
-                    }
-                    
-                    weekly_content = await ai_service.generate_horoscope(
-                        user_data, "weekly", user.language_code
-                    )
-                    
-                    # Save to database
-                    horoscope = Horoscope(
-                        user_id=user.id,
-                        horoscope_type="weekly",
-                        content=weekly_content,
-                        date_for=datetime.now().date(),
-                        ai_model_used=settings.ai_model
-                    )
-                    db.add(horoscope)
-                    
-                    # Send to user
-                    message = f"🌟 Your Weekly Insights\n\n{weekly_content}"
-                    await bot.send_message(chat_id=user.telegram_id, text=message)
-                    
-                    sent_count += 1
-                    logger.info(f"Sent weekly insights to user {user.telegram_id}")
-                    
-                except Exception as e:
-                    logger.error(f"Error sending weekly insights to user {user.telegram_id}: {e}")
-                    continue
+        )
+        
+        slots = asyncio.Semaphore(WEEKLY_INSIGHTS_CONCURRENCY)
+        bot = await get_bot()
+        sent_count = 0
+        
+        # Premium users are read in keyset pages of USER_SCAN_BATCH_SIZE, each in
+        # its own short session, so no connection is held while the AI runs
+        last_id = 0
+        while True:
+            async with get_async_db() as db:
+                users = (await db.scalars(
+                    select(User).where(
+                        and_(
+                            User.is_premium == True,
+                            User.is_active == True,
+                            User.birth_date.isnot(None),
+                            User.id > last_id,
+                            User.id.not_in(already_sent)
+                        )
+                    ).order_by(User.id).limit(USER_SCAN_BATCH_SIZE)
+                )).all()
+            if not users:
+                break
+            last_id = users[-1].id
             
-            await db.commit()
-            logger.info(f"Sent {sent_count} weekly insights")
+            results = await asyncio.gather(*(
+                _send_weekly_insights(bot, user, today, slots) for user in users
+            ))
             
+            # Each batch's horoscopes are stored in one transaction
+            horoscopes = [horoscope for horoscope, _ in results if horoscope is not None]
+            if horoscopes:
+                async with get_async_db() as db, db.begin():
+                    db.add_all(horoscopes)
+            sent_count += sum(sent for _, sent in results)
+        
+        logger.info(f"Sent {sent_count} weekly insights")
+        
     except Exception as e:
         logger.error(f"Error in generate_weekly_insights task: {e}")
         raise
@@ -75,6 +75,7 @@ GEOCODING_API_KEY=$GEOCODING_API_KEY
 SECRET_KEY=$SECRET_KEY
 TIMEZONE=$TIMEZONE
 LOG_LEVEL=INFO
+AUTO_MIGRATE=true
 CELERY_BROKER_URL=redis://redis:6379/0
 CELERY_RESULT_BACKEND=redis://redis:6379/0
 STATIC_FILES_PATH=/app/static